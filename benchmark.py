@@ -0,0 +1,359 @@
+"""
+benchmark.py
+16. October 2026
+
+Headless scaling benchmark: particle count, box length and species mix
+against the cost of every phase of a step
+
+Author:
+Nilusink
+"""
+from species import Species, SpeciesRegistry
+from instrumentation import Profiler, PHASES
+from spawning import spawn_particles
+from particles import ParticleArrays
+from simulation import Simulation
+from datetime import datetime
+from box import _Box
+import typing as tp
+import numpy as np
+import platform
+import argparse
+import json
+import math
+import time
+import os
+
+
+# box height is fixed by `_Box`
+BOX_HEIGHT = 600
+
+# free lattice cells per particle, so the spawner still has a choice
+SPAWN_ROOM = 1.5
+
+# run settings a baseline is only comparable with, and their defaults for
+# baselines that don't record them
+CONFIG_DEFAULTS = {
+    "backend": "numpy",
+    "broad_phase": "grid",
+    "workers": 1,
+    "render": False,
+}
+
+
+def _registry(count: int, length: float) -> SpeciesRegistry:
+    """
+    a light and a heavy species, as big as the default ones if they fit,
+    else scaled down until `count` of them fit into the box
+    """
+    cell = math.sqrt((length - 2) * (BOX_HEIGHT - 2) / (count * SPAWN_ROOM))
+    radius = min(15., (cell - 1) / 2)
+
+    registry = SpeciesRegistry()
+    registry.register(Species("light", 7e-23, radius * 7 / 15, (255, 0, 0)))
+    registry.register(Species("heavy", 15e-23, radius, (0, 0, 255)))
+
+    return registry
+
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    """
+    "light=1,heavy=3" -> {"light": 1., "heavy": 3.}
+    """
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+
+    return weights
+
+
+def bench_case(
+        count: int,
+        length: float,
+        mix: str,
+        seconds: float = 1,
+        temperature: float = 10,
+        backend: str = "numpy",
+        broad_phase: str = "grid",
+        render: bool = False,
+        seed: int = 0,
+        workers: int = 1
+) -> dict[str, tp.Any]:
+    """
+    time one configuration
+
+    `Simulation.step` is run for `seconds` but at least three steps and
+    timed by its profiler. a step hook asks for the stats like the control
+    server does, so "hooks" includes "stats"
+
+    :returns: per phase ns per particle and step, steps per second and the
+        cost of adding / removing 1% of the particles
+    """
+    box = _Box()
+    box.world_size = (int(length) + 200, BOX_HEIGHT + 200)
+    box.set_length(length)
+
+    store = ParticleArrays(box=box, species=_registry(count, box.size.x))
+    simulation = Simulation(
+        store,
+        box,
+        None,
+        broad_phase=broad_phase,
+        backend=backend,
+        seed=seed,
+        workers=workers
+    )
+    try:
+        return _run_case(
+            simulation, count, mix, seconds, temperature, render
+        )
+
+    finally:
+        simulation.close()
+
+
+def _run_case(
+        simulation: Simulation,
+        count: int,
+        mix: str,
+        seconds: float,
+        temperature: float,
+        render: bool
+) -> dict[str, tp.Any]:
+    """
+    spawn the particles, warm up and time `simulation` (see `bench_case`)
+    """
+    box = simulation.box
+    store = simulation.particles
+    spawn_particles(store, count, temperature, _parse_mix(mix))
+    simulation.step_hooks.append(lambda s: s.stats())
+
+    renderer = screen = None
+    if render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        from renderer import LODRenderer
+        import pygame
+
+        screen = pygame.Surface(box.world_size)
+        renderer = LODRenderer((255, 255, 255))
+
+    # warm up (numba compiles on the first call, workers start)
+    simulation.step()
+
+    # a window long enough to keep every timed step
+    profiler = simulation.profiler = Profiler(window=1_000_000)
+    profiler.enable()
+
+    steps = substeps = 0
+    elapsed = 0.
+    end = time.perf_counter() + seconds
+    while steps < 3 or time.perf_counter() < end:
+        substeps += simulation.substeps()
+
+        start = time.perf_counter()
+        simulation.step()
+
+        # lands in the next step of the profiler, the totals still match
+        if renderer is not None:
+            with profiler.phase("render"):
+                renderer.render(screen, box, store, None)
+
+        elapsed += time.perf_counter() - start
+        steps += 1
+
+    profiler.end_step()
+    summary = profiler.summary()
+
+    # particle count changes, 1% of the particles at once
+    change = max(count // 100, 1)
+    change_start = time.perf_counter_ns()
+    store.change_particles(change, recalculate=False)
+    store.change_particles(-change, recalculate=False)
+    change_ns = time.perf_counter_ns() - change_start
+
+    return {
+        "count": count,
+        "length": box.size.x,
+        "mix": mix,
+        "radius": float(store.species.radii.max()),
+        "steps": steps,
+        "substeps": substeps / steps,
+        "steps_per_second": steps / elapsed,
+        "ns_per_particle": {
+            # summary: average ms per profiler step
+            phase: summary[phase] * summary["steps"] * 1e6 / (steps * count)
+            for phase in PHASES
+            if phase != "render" or render
+        },
+        "change_ns_per_particle": change_ns / (2 * change),
+    }
+
+
+def _key(case: dict) -> tuple:
+    return case["count"], case["length"], case["mix"]
+
+
+def config_differences(
+        config: dict[str, tp.Any],
+        baseline: dict[str, tp.Any]
+) -> list[str]:
+    """
+    run settings that differ from the ones a baseline file was made with
+
+    :param config: settings of this run (keys of `CONFIG_DEFAULTS`)
+    :param baseline: the whole baseline file
+    :returns: one line per difference
+    """
+    differences = []
+    for key, default in CONFIG_DEFAULTS.items():
+        was = baseline.get(key, default)
+        if config[key] != was:
+            differences.append(f"{key}: {was} (baseline) vs {config[key]}")
+
+    return differences
+
+
+def compare(
+        results: list[dict],
+        baseline: list[dict],
+        tolerance: float = .2
+) -> list[str]:
+    """
+    check the results against a baseline run
+
+    :param tolerance: allowed slowdown (0.2 = 20%)
+    :returns: one line per regression
+    """
+    old = {_key(case): case for case in baseline}
+    regressions = []
+    for case in results:
+        if _key(case) not in old:
+            continue
+
+        before = old[_key(case)]
+        name = f"n={case['count']} l={case['length']:g} mix={case['mix']}"
+
+        for phase, ns in case["ns_per_particle"].items():
+            was = before["ns_per_particle"].get(phase)
+            if was and ns > was * (1 + tolerance):
+                regressions.append(
+                    f"{name} {phase}: {was:.1f} -> {ns:.1f} ns/particle"
+                )
+
+        was = before["change_ns_per_particle"]
+        if case["change_ns_per_particle"] > was * (1 + tolerance):
+            regressions.append(
+                f"{name} change: {was:.1f} -> "
+                f"{case['change_ns_per_particle']:.1f} ns/particle"
+            )
+
+        was = before["steps_per_second"]
+        if case["steps_per_second"] < was / (1 + tolerance):
+            regressions.append(
+                f"{name} steps/s: {was:.1f} -> "
+                f"{case['steps_per_second']:.1f}"
+            )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="sweep particle count, box length and species mix and "
+                    "time every phase of a step"
+    )
+    parser.add_argument(
+        "-n", "--counts", type=int, nargs="+",
+        default=[100, 1_000, 10_000, 100_000]
+    )
+    parser.add_argument(
+        "-l", "--lengths", type=float, nargs="+", default=[1000]
+    )
+    parser.add_argument(
+        "-m", "--mixes", nargs="+", default=["light=1,heavy=1"],
+        help="relative weights per species, e.g. light=3,heavy=1"
+    )
+    parser.add_argument("-s", "--seconds", type=float, default=1)
+    parser.add_argument("-t", "--temperature", type=float, default=10)
+    parser.add_argument("-b", "--broad-phase", default="grid")
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument("--render", action="store_true")
+    parser.add_argument("-o", "--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file to compare with")
+    parser.add_argument("--tolerance", type=float, default=.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = {
+        "backend": args.backend,
+        "broad_phase": args.broad_phase,
+        "workers": args.workers,
+        "render": args.render,
+    }
+
+    # a baseline made with other settings can't tell about regressions
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        differences = config_differences(config, baseline)
+        if differences:
+            parser.error(
+                "the baseline was run with other settings: "
+                + ", ".join(differences)
+            )
+
+    results = []
+    for length in args.lengths:
+        for mix in args.mixes:
+            for count in args.counts:
+                case = bench_case(
+                    count,
+                    length,
+                    mix,
+                    args.seconds,
+                    args.temperature,
+                    args.backend,
+                    args.broad_phase,
+                    args.render,
+                    args.seed,
+                    args.workers
+                )
+                results.append(case)
+
+                phases = "  ".join(
+                    f"{phase} {ns:.0f}"
+                    for phase, ns in case["ns_per_particle"].items()
+                )
+                print(
+                    f"n={count:>7} l={case['length']:g} {mix}: "
+                    f"{case['steps_per_second']:8.1f} steps/s  "
+                    f"ns/particle: {phases}"
+                )
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump({
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                **config,
+                "seed": args.seed,
+                "results": results,
+            }, out, indent=2)
+
+    if baseline is not None:
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
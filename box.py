@@ -9,7 +9,6 @@ Nilusink
 """
 from physics_calculations import volume_from_pressure
 from vectors import Vec2
-import pygame
 
 
 class _Box:
@@ -65,7 +64,7 @@ class _Box:
 
     @property
     def world_size(self) -> tuple[int, int]:
-        return self._world_size.copy()
+        return tuple(self._world_size)
 
     @world_size.setter
     def world_size(self, value: tuple[int, int]) -> None:
@@ -79,6 +78,9 @@ class _Box:
         return (self._size.x * self._size.y) * 1e-28
 
     def draw(self, screen) -> None:
+        # pygame is only needed for drawing, the simulation runs without it
+        import pygame
+
         pygame.draw.rect(
             screen,
             (0, 0, 0, 255),
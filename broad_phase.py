@@ -0,0 +1,211 @@
+"""
+broad_phase.py
+16. October 2026
+
+Collision broad phases: find the pairs of particles that could touch
+
+Author:
+Nilusink
+"""
+import typing as tp
+import numpy as np
+
+
+if tp.TYPE_CHECKING:
+    from particles import ParticleArrays
+
+
+type Pairs = tuple[np.ndarray, np.ndarray]
+
+
+def _expand_ranges(
+        starts: np.ndarray,
+        counts: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    turn a range `[start, start + count)` per element into flat arrays
+
+    :returns: tuple[element each entry belongs to, flat index]
+    """
+    total = int(counts.sum())
+    owners = np.repeat(np.arange(len(counts)), counts)
+
+    # position of every entry inside its own range
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return owners, np.repeat(starts, counts) + offsets
+
+
+def _sorted_pairs(a: np.ndarray, b: np.ndarray) -> Pairs:
+    """
+    order every pair as (low, high) and sort them like the nested loop would
+    """
+    i = np.minimum(a, b)
+    j = np.maximum(a, b)
+    order = np.lexsort((j, i))
+
+    return i[order], j[order]
+
+
+class BroadPhase:
+    """
+    base class for collision broad phases
+    """
+    name: str = ...
+
+    def pairs(self, particles: "ParticleArrays") -> Pairs:
+        """
+        :returns: tuple[first indices, second indices] of candidate pairs,
+            always with first < second
+        """
+        raise NotImplementedError
+
+
+class BruteForce(BroadPhase):
+    """
+    every particle against every other one, O(n²)
+    """
+    name = "brute"
+
+    def pairs(self, particles: "ParticleArrays") -> Pairs:
+        return np.triu_indices(len(particles), k=1)
+
+
+class SpatialHash(BroadPhase):
+    """
+    uniform grid broad phase
+
+    the cell size defaults to the largest particle diameter, so touching
+    particles are always in the same or in neighbouring cells. only half of
+    the neighbours are checked, so every pair is found exactly once
+    """
+    name = "grid"
+    _neighbours: tuple[tuple[int, int], ...] = ((1, 0), (-1, 1), (0, 1), (1, 1))
+
+    def __init__(self, cell_size: float | None = None) -> None:
+        self.cell_size = cell_size
+
+    def _sorted_cells(
+            self,
+            particles: "ParticleArrays"
+    ) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        :returns: tuple[particles sorted by cell, their cell keys, grid width]
+        """
+        cell_size = self.cell_size
+        if cell_size is None:
+            cell_size = 2 * float(particles.radii.max())
+
+        cells = np.floor(particles.positions / cell_size).astype(np.int64)
+        cells -= cells.min(axis=0)
+
+        # one spare column, so `x - 1` never wraps into an occupied cell
+        width = int(cells[:, 0].max()) + 2
+        keys = cells[:, 0] + cells[:, 1] * width
+
+        order = np.argsort(keys, kind="stable")
+
+        return order, keys[order], width
+
+    def pairs(self, particles: "ParticleArrays") -> Pairs:
+        if len(particles) < 2:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        order, sorted_keys, width = self._sorted_cells(particles)
+
+        firsts = []
+        seconds = []
+
+        # pairs inside the same cell
+        starts = np.searchsorted(sorted_keys, sorted_keys, "left")
+        ends = np.searchsorted(sorted_keys, sorted_keys, "right")
+        owners, flat = _expand_ranges(starts, ends - starts)
+        keep = flat > owners
+        firsts.append(order[owners[keep]])
+        seconds.append(order[flat[keep]])
+
+        # pairs with the neighbouring cells
+        for dx, dy in self._neighbours:
+            neighbour_keys = sorted_keys + dx + dy * width
+            starts = np.searchsorted(sorted_keys, neighbour_keys, "left")
+            ends = np.searchsorted(sorted_keys, neighbour_keys, "right")
+            owners, flat = _expand_ranges(starts, ends - starts)
+            firsts.append(order[owners])
+            seconds.append(order[flat])
+
+        return _sorted_pairs(np.concatenate(firsts), np.concatenate(seconds))
+
+
+class SweepAndPrune(BroadPhase):
+    """
+    sort and sweep along the x axis
+
+    the sort order (by `x - radius`) is kept between frames and repaired
+    with a stable sort of the previous order, which is close to O(n) since
+    gas particles barely change their order from one frame to the next
+    """
+    name = "sap"
+
+    def __init__(self) -> None:
+        self._order = np.empty(0, dtype=np.intp)
+
+    @staticmethod
+    def _repair_order(order: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """
+        sort `order` by `keys[order]`, fast for almost sorted orders
+        """
+        sorted_keys = keys[order]
+        if not np.any(sorted_keys[1:] < sorted_keys[:-1]):
+            return order
+
+        # timsort (stable) only merges the few runs that got out of order
+        return order[np.argsort(sorted_keys, kind="stable")]
+
+    def pairs(self, particles: "ParticleArrays") -> Pairs:
+        n = len(particles)
+        positions = particles.positions
+        radii = particles.radii
+        starts = positions[:, 0] - radii
+
+        # particles were added or removed, start over
+        if len(self._order) != n:
+            self._order = np.argsort(starts, kind="stable")
+
+        else:
+            self._order = self._repair_order(self._order, starts)
+
+        order = self._order
+        sorted_starts = starts[order]
+        sorted_ends = sorted_starts + 2 * radii[order]
+
+        # everything starting before a particle ends overlaps it on x
+        lasts = np.searchsorted(sorted_starts, sorted_ends, "right")
+        firsts = np.arange(1, n + 1)
+        owners, flat = _expand_ranges(firsts, np.maximum(lasts - firsts, 0))
+        a = order[owners]
+        b = order[flat]
+
+        # prune the ones that don't overlap on y
+        keep = np.abs(positions[a, 1] - positions[b, 1]) <= radii[a] + radii[b]
+
+        return _sorted_pairs(a[keep], b[keep])
+
+
+BROAD_PHASES: dict[str, type[BroadPhase]] = {
+    BruteForce.name: BruteForce,
+    SpatialHash.name: SpatialHash,
+    SweepAndPrune.name: SweepAndPrune,
+}
+
+
+def make_broad_phase(name: str) -> BroadPhase:
+    """
+    create a broad phase by its name
+    """
+    if name not in BROAD_PHASES:
+        raise ValueError(
+            f"unknown broad phase \"{name}\", "
+            f"valid are: {', '.join(BROAD_PHASES)}"
+        )
+
+    return BROAD_PHASES[name]()
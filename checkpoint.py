@@ -0,0 +1,256 @@
+"""
+checkpoint.py
+16. October 2026
+
+Binary checkpoints of the particles, box, species and random generator
+
+a checkpoint is a small JSON header followed by the raw particle arrays:
+
+    prefix:  magic (8s) | version (I) | header length (I), little endian
+    header:  JSON (array layout, box, species, stats, rng state, extra)
+    arrays:  raw, every one aligned to 64 bytes
+
+so the arrays can be memory mapped instead of read
+
+Author:
+Nilusink
+"""
+from species import Species, SpeciesRegistry
+from particles import ParticleArrays
+from stats import RunningStats
+from box import _Box
+import typing as tp
+import numpy as np
+import tempfile
+import struct
+import json
+import os
+
+
+MAGIC = b"GPSSTATE"
+VERSION = 1
+
+_PREFIX = struct.Struct("<8sII")
+_ALIGN = 64
+
+ARRAYS = (
+    "positions", "velocities", "radii", "masses", "colors", "species_ids"
+)
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _umask() -> int:
+    # can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return umask
+
+
+def save(
+        path: str,
+        particles: ParticleArrays,
+        extra: dict[str, tp.Any] | None = None
+) -> None:
+    """
+    write the particles (with their box, species and rng) to `path`
+
+    the checkpoint is written to a temporary file which then replaces
+    `path`, so a store still mapped to `path` keeps its (old) file
+
+    :param extra: additional JSON values stored in the header (e.g. the
+        step count)
+    """
+    arrays = {name: getattr(particles, name) for name in ARRAYS}
+    box = particles.box
+    stats = particles.stats
+    try:
+        world_size = list(box.world_size)
+
+    except TypeError:
+        # not set yet
+        world_size = None
+
+    header: dict[str, tp.Any] = {
+        "n": len(particles),
+        "box": {
+            "pos": list(box.pos.xy),
+            "size": list(box.size.xy),
+            "world_size": world_size,
+        },
+        "species": [
+            {
+                "name": s.name,
+                "mass": s.mass,
+                "radius": s.radius,
+                "color": list(s.color),
+            }
+            for s in particles.species
+        ],
+        "stats": {
+            "count": stats.count.tolist(),
+            "mv2": stats.mv2.tolist(),
+            "speed": stats.speed.tolist(),
+            "momentum": stats.momentum.tolist(),
+        },
+        "rng": particles.rng.bit_generator.state,
+        "extra": extra or {},
+        "arrays": {},
+    }
+
+    # the offsets depend on the header length, which depends on the
+    # offsets, so leave enough room for them first
+    for name, array in arrays.items():
+        header["arrays"][name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": 0,
+        }
+
+    encoded = json.dumps(header).encode("utf-8")
+    offset = _aligned(_PREFIX.size + len(encoded) + 32 * len(arrays))
+    for name, array in arrays.items():
+        header["arrays"][name]["offset"] = offset
+        offset = _aligned(offset + array.nbytes)
+
+    encoded = json.dumps(header).encode("utf-8")
+
+    descriptor, temp_path = tempfile.mkstemp(
+        ".tmp", os.path.basename(path) + ".", os.path.dirname(path) or "."
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as out:
+            out.write(_PREFIX.pack(MAGIC, VERSION, len(encoded)))
+            out.write(encoded)
+
+            for name, array in arrays.items():
+                out.seek(header["arrays"][name]["offset"])
+                np.ascontiguousarray(array).tofile(out)
+
+        # mkstemp only gives the owner access, use what `open` would
+        os.chmod(temp_path, 0o666 & ~_umask())
+        os.replace(temp_path, path)
+
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_header(path: str) -> dict[str, tp.Any]:
+    """
+    :raises ValueError: if `path` isn't a checkpoint of this version
+    """
+    with open(path, "rb") as file:
+        prefix = file.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError(f"{path} is not a checkpoint")
+
+        magic, version, length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a checkpoint")
+
+        if version != VERSION:
+            raise ValueError(f"unsupported checkpoint version {version}")
+
+        return json.loads(file.read(length).decode("utf-8"))
+
+
+def _species_ids(
+        registry: SpeciesRegistry,
+        saved: list[dict[str, tp.Any]],
+        species_ids: np.ndarray
+) -> tuple[np.ndarray, bool]:
+    """
+    map the saved species ids onto `registry`, registering missing species
+
+    :returns: tuple[species ids, whether they had to be changed]
+    """
+    mapping = np.empty(len(saved), dtype=species_ids.dtype)
+    for i, s in enumerate(saved):
+        try:
+            mapping[i] = registry.id_of(s["name"])
+
+        except KeyError:
+            mapping[i] = registry.register(Species(
+                s["name"], s["mass"], s["radius"], tuple(s["color"])
+            ))
+
+    if np.array_equal(mapping, np.arange(len(saved))):
+        return species_ids, False
+
+    return mapping[species_ids], True
+
+
+def load(
+        path: str,
+        particles: ParticleArrays | None = None,
+        mmap: bool = True
+) -> tuple[ParticleArrays, dict[str, tp.Any]]:
+    """
+    restore a checkpoint
+
+    :param particles: store to load into (its box and species registry are
+        updated), a new one with its own box and registry if not given.
+        an existing box keeps its world size, it's the window size
+    :param mmap: map the arrays copy-on-write instead of reading them, so
+        loading takes milliseconds and pages are only read when touched
+    :returns: tuple[store, extra header values]
+    """
+    header = read_header(path)
+    n = header["n"]
+    saved_box = header["box"]
+
+    if particles is None:
+        box = _Box()
+        if saved_box["world_size"] is not None:
+            box.world_size = tuple(saved_box["world_size"])
+
+        particles = ParticleArrays(0, box, SpeciesRegistry())
+
+    particles.box.set_length(saved_box["size"][0])
+
+    arrays = {}
+    for name in ARRAYS:
+        layout = header["arrays"][name]
+        dtype = np.dtype(layout["dtype"])
+        shape = tuple(layout["shape"])
+
+        if n == 0:
+            arrays[name] = np.zeros(shape, dtype=dtype)
+
+        elif mmap:
+            arrays[name] = np.memmap(
+                path, dtype, "c", layout["offset"], shape
+            )
+
+        else:
+            arrays[name] = np.fromfile(
+                path, dtype, int(np.prod(shape)), offset=layout["offset"]
+            ).reshape(shape)
+
+    arrays["species_ids"], remapped = _species_ids(
+        particles.species, header["species"], arrays["species_ids"]
+    )
+
+    # the saved sums are per species id, so only valid if they didn't change
+    stats = None
+    if not remapped:
+        stats = RunningStats()
+        stats.count = np.array(header["stats"]["count"], dtype=np.int64)
+        stats.mv2 = np.array(header["stats"]["mv2"], dtype=np.float64)
+        stats.speed = np.array(header["stats"]["speed"], dtype=np.float64)
+        stats.momentum = np.array(
+            header["stats"]["momentum"], dtype=np.float64
+        )
+
+    particles.restore(**arrays, stats=stats)
+
+    state = header["rng"]
+    bit_generator = getattr(np.random, state["bit_generator"])()
+    bit_generator.state = state
+    particles.rng = np.random.Generator(bit_generator)
+
+    return particles, header["extra"]
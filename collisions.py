@@ -0,0 +1,149 @@
+"""
+collisions.py
+16. October 2026
+
+Vectorized collision resolution for batches of contact pairs
+
+Author:
+Nilusink
+"""
+import typing as tp
+import numpy as np
+
+
+if tp.TYPE_CHECKING:
+    from particles import ParticleArrays
+
+
+def _independent(i: np.ndarray, j: np.ndarray, n: int) -> np.ndarray:
+    """
+    select the pairs that come first for both of their particles, so no
+    particle is in more than one of the selected pairs
+    """
+    k = np.arange(len(i))
+    first = np.full(n, len(i))
+    np.minimum.at(first, i, k)
+    np.minimum.at(first, j, k)
+
+    return (first[i] == k) & (first[j] == k)
+
+
+def _resolve_batch(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        radii: np.ndarray,
+        masses: np.ndarray,
+        a: np.ndarray,
+        b: np.ndarray
+) -> int:
+    """
+    resolve pairs in which every particle occurs at most once
+    (same math as `Particle.collide`, `a` being self and `b` other)
+
+    :returns: number of pairs that actually touched
+    """
+    delta = positions[a] - positions[b]
+    distance = np.hypot(delta[:, 0], delta[:, 1])
+    reach = radii[a] + radii[b]
+
+    hit = distance < reach
+    a, b = a[hit], b[hit]
+    delta, distance, reach = delta[hit], distance[hit], reach[hit]
+
+    # contact normal (pointing from b to a) and tangent
+    normal = np.empty_like(delta)
+    touching = distance > 0
+    normal[touching] = delta[touching] / distance[touching, None]
+    normal[~touching] = 1, 0
+    tangent = np.stack((normal[:, 1], -normal[:, 0]), axis=1)
+
+    # move other out of way
+    positions[b] = positions[a] - normal * reach[:, None]
+
+    # split the velocities in two directions (90°)
+    now_collision = np.einsum("ij,ij->i", velocities[a], normal)
+    now_carry = np.einsum("ij,ij->i", velocities[a], tangent)
+    inf_collision = np.einsum("ij,ij->i", velocities[b], normal)
+    inf_carry = np.einsum("ij,ij->i", velocities[b], tangent)
+
+    # 1D elastic collision along the normal
+    now_mass = masses[a]
+    inf_mass = masses[b]
+    total_mass = now_mass + inf_mass
+
+    now_v = now_collision * now_mass
+    now_v += (inf_collision * 2 - now_collision) * inf_mass
+    now_v /= total_mass
+
+    inf_v = inf_collision * inf_mass
+    inf_v += (now_collision * 2 - inf_collision) * now_mass
+    inf_v /= total_mass
+
+    # assign velocities
+    velocities[a] = now_carry[:, None] * tangent + now_v[:, None] * normal
+    velocities[b] = inf_carry[:, None] * tangent + inf_v[:, None] * normal
+
+    return len(a)
+
+
+def touching_pairs(
+        positions: np.ndarray,
+        radii: np.ndarray,
+        i: np.ndarray,
+        j: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    narrow phase, drop candidates that don't touch
+    """
+    delta = positions[i] - positions[j]
+    touching = np.hypot(delta[:, 0], delta[:, 1]) < radii[i] + radii[j]
+
+    return i[touching], j[touching]
+
+
+def resolve_pairs(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        radii: np.ndarray,
+        masses: np.ndarray,
+        i: np.ndarray,
+        j: np.ndarray
+) -> int:
+    """
+    resolve touching pairs directly on the arrays (no stats bookkeeping)
+
+    pairs sharing a particle are split into rounds: every round takes the
+    pairs that come first for both of their particles, so the result only
+    depends on the order of the touching pairs (like the sequential nested
+    loop) and not on which broad phase found them
+
+    :returns: number of pairs that actually touched
+    """
+    resolved = 0
+    while len(i):
+        batch = _independent(i, j, len(positions))
+        resolved += _resolve_batch(
+            positions, velocities, radii, masses, i[batch], j[batch]
+        )
+        i, j = i[~batch], j[~batch]
+
+    return resolved
+
+
+def resolve_collisions(
+        particles: "ParticleArrays",
+        pairs: tuple[np.ndarray, np.ndarray]
+) -> int:
+    """
+    resolve all contacts of a broad phase at once
+
+    :returns: number of pairs that actually touched
+    """
+    positions = particles.positions
+    radii = particles.radii
+    i, j = touching_pairs(positions, radii, *pairs)
+
+    with particles.changing_velocities(np.union1d(i, j)):
+        return resolve_pairs(
+            positions, particles.velocities, radii, particles.masses, i, j
+        )
@@ -0,0 +1,85 @@
+"""
+commands.py
+16. October 2026
+
+Bounded, thread-safe queue for changes to the simulation
+
+Author:
+Nilusink
+"""
+from threading import Lock
+import typing as tp
+import operator
+import queue
+
+
+# how several queued values of the same command are combined into one
+COALESCE: dict[str, tp.Callable[[tp.Any, tp.Any], tp.Any]] = {
+    "len": lambda old, new: new,    # last one wins
+    "vel": operator.mul,            # multipliers multiply
+    "num": operator.add,            # particle changes add up
+}
+
+
+class CommandQueue:
+    """
+    collects changes from other threads (control server, keyboard) until
+    the engine drains them at the next step boundary
+
+    known commands (`COALESCE`) are combined as they arrive, so they never
+    take more than one slot each. everything else is a plain callable and
+    runs in the order it was put
+    """
+    def __init__(self, maxsize: int = 1024) -> None:
+        """
+        :param maxsize: most callables waiting at the same time
+        """
+        self.maxsize = maxsize
+        self._lock = Lock()
+        self._coalesced: dict[str, tp.Any] = {}
+        self._calls: list[tp.Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._coalesced) + len(self._calls)
+
+    def put(self, key: str, value: tp.Any) -> None:
+        """
+        queue a known command, combined with the one already waiting
+
+        :raises ValueError: if `key` has no coalescing rule
+        """
+        if key not in COALESCE:
+            raise ValueError(f"unknown command \"{key}\"")
+
+        with self._lock:
+            if key in self._coalesced:
+                value = COALESCE[key](self._coalesced[key], value)
+
+            self._coalesced[key] = value
+
+    def call(self, command: tp.Callable[[], None]) -> None:
+        """
+        queue an arbitrary callable
+
+        :raises queue.Full: if `maxsize` callables are already waiting
+        """
+        with self._lock:
+            if len(self._calls) >= self.maxsize:
+                raise queue.Full
+
+            self._calls.append(command)
+
+    def drain(self) -> tuple[dict[str, tp.Any], list[tp.Callable[[], None]]]:
+        """
+        take everything that is waiting
+
+        :returns: combined commands (in `COALESCE` order) and callables
+        """
+        with self._lock:
+            coalesced, self._coalesced = self._coalesced, {}
+            calls, self._calls = self._calls, []
+
+        return {
+            key: coalesced[key] for key in COALESCE if key in coalesced
+        }, calls
@@ -0,0 +1,420 @@
+"""
+control_server.py
+16. October 2026
+
+asyncio control server, lets many clients (settings GUI, dashboards,
+scripts) talk to the simulation at the same time
+
+Author:
+Nilusink
+"""
+from protocol import Frame, ProtocolError, MAX_DATAGRAM
+from contextlib import suppress
+from threading import Thread, Event
+import typing as tp
+import asyncio
+import struct
+import math
+import time
+
+
+if tp.TYPE_CHECKING:
+    from simulation import Simulation
+
+
+# stream connections (TCP / unix socket) prefix every frame with its length
+_LENGTH = struct.Struct("!I")
+
+# UDP subscriptions have to be renewed within this many seconds
+SUBSCRIPTION_TIMEOUT = 10
+
+
+class _Subscription:
+    """
+    a client that wants stats pushed `rate` times per second
+    """
+    def __init__(
+            self,
+            send: tp.Callable[[bytes], None],
+            rate: float,
+            binary: bool,
+            expires: float
+    ) -> None:
+        self.send = send
+        self.interval = 1 / rate
+        self.binary = binary
+        self.expires = expires
+        self.next_due = 0
+        self.sequence = 0
+
+
+class _DatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "ControlServer") -> None:
+        self._server = server
+        self.transport: asyncio.DatagramTransport | None = None
+        self.peers: set[tuple] = set()
+
+    def connection_made(self, transport: asyncio.DatagramTransport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        self.peers.add(addr)
+        reply = self._server.handle(
+            data,
+            ("udp", addr),
+            lambda frame: self.transport.sendto(frame, addr)
+        )
+
+        if reply is not None:
+            self.transport.sendto(reply, addr)
+
+
+class ControlServer:
+    """
+    answers queries right away and schedules mutating commands (`vel`,
+    `len`, `num`) on the simulation, so they are applied between two steps
+
+    queries are answered from a snapshot taken by the simulation thread
+    after every step, the running stats are only consistent between steps
+
+    clients can also subscribe (`sub`) to get stats pushed at their own
+    rate, they are sent the same snapshot
+
+    the event loop runs in its own thread next to the simulation loop
+    """
+    def __init__(
+            self,
+            simulation: "Simulation",
+            host: str = "127.0.0.1",
+            port: int | None = 24323,
+            tcp_port: int | None = None,
+            unix_path: str | None = None
+    ) -> None:
+        """
+        :param port: UDP port (None to disable)
+        :param tcp_port: TCP port (None to disable)
+        :param unix_path: path of a unix socket (None to disable)
+        """
+        self.simulation = simulation
+        self.host = host
+        self.port = port
+        self.tcp_port = tcp_port
+        self.unix_path = unix_path
+
+        self._loop = asyncio.new_event_loop()
+        self._thread: Thread | None = None
+        self._udp: _DatagramProtocol | None = None
+        self._servers: list[asyncio.Server] = []
+        self._writers: set[asyncio.StreamWriter] = set()
+
+        # only touched from the event loop thread
+        self._subscriptions: dict[tp.Hashable, _Subscription] = {}
+
+        # earliest time a subscription is due, read by the simulation thread
+        self._next_publish = float("inf")
+
+        # replaced (never changed) by the simulation thread after every step
+        self._snapshot: dict = {}
+
+    @property
+    def running(self) -> bool:
+        return self._loop.is_running()
+
+    # request handling
+    def handle(
+            self,
+            data: bytes,
+            client: tp.Hashable,
+            send: tp.Callable[[bytes], None]
+    ) -> bytes | None:
+        """
+        handle one received frame
+
+        :param client: identifies the client (for subscriptions)
+        :param send: sends an encoded frame to the client
+        :returns: encoded answer, None if nothing was requested
+        """
+        try:
+            request = Frame.decode(data)
+
+        except ProtocolError:
+            return None
+
+        simulation = self.simulation
+        snapshot = self._snapshot
+        answer: dict = {}
+        for key, value in request.commands:
+            match key:
+                case "vel" | "len" | "num":
+                    # JSON values aren't typed (and JSON / `!d` allow NaN
+                    # and inf), a bad one would only fail once the
+                    # simulation applies it
+                    try:
+                        if not math.isfinite(value := float(value)):
+                            raise ValueError
+
+                        if key == "num":
+                            value = int(value)
+
+                    except (TypeError, ValueError, OverflowError):
+                        print(f"INVALID VALUE: \"{key}\": {value!r}")
+                        continue
+
+                    simulation.command(key, value)
+
+                case "rvel":
+                    answer["vel"] = snapshot["vel"]
+
+                case "rnum":
+                    answer["num"] = snapshot["num"]
+
+                case "rstats":
+                    answer["stats"] = snapshot["stats"]
+
+                case "prof":
+                    simulation.profiler.enable(bool(value))
+
+                case "rprof":
+                    answer["profile"] = simulation.profiler.summary()
+
+                case "sub":
+                    try:
+                        if not math.isfinite(rate := float(value)):
+                            raise ValueError
+
+                    except (TypeError, ValueError, OverflowError):
+                        print(f"INVALID VALUE: \"{key}\": {value!r}")
+                        continue
+
+                    self._subscribe(client, send, rate, request.binary)
+
+                case _:
+                    print(f"INVALID KEY: \"{key}\"")
+
+        if not answer:
+            return None
+
+        return Frame(answer, request.sequence, request.binary).encode()
+
+    # subscriptions
+    def _subscribe(
+            self,
+            client: tp.Hashable,
+            send: tp.Callable[[bytes], None],
+            rate: float,
+            binary: bool
+    ) -> None:
+        """
+        add, renew or (rate <= 0) remove a subscription
+        """
+        if not rate or rate <= 0:
+            self._subscriptions.pop(client, None)
+
+        else:
+            # stream clients unsubscribe by disconnecting
+            expires = float("inf")
+            if client[0] == "udp":
+                expires = time.monotonic() + SUBSCRIPTION_TIMEOUT
+
+            subscription = self._subscriptions.get(client)
+            if subscription is None:
+                self._subscriptions[client] = _Subscription(
+                    send, rate, binary, expires
+                )
+
+            else:
+                # renewal, keep the schedule and sequence going
+                subscription.interval = 1 / rate
+                subscription.expires = expires
+
+        self._update_next_publish()
+
+    def _update_next_publish(self) -> None:
+        self._next_publish = min(
+            (s.next_due for s in self._subscriptions.values()),
+            default=float("inf")
+        )
+
+    @staticmethod
+    def _take_snapshot(simulation: "Simulation") -> dict:
+        """
+        everything clients can query, only valid between two steps
+        """
+        particles = simulation.particles
+        return {
+            "stats": simulation.stats(),
+            "num": len(particles),
+            "vel": particles.get_av_energy(),
+        }
+
+    def _on_step(self, simulation: "Simulation") -> None:
+        """
+        step hook (simulation thread): take a new snapshot and hand it to
+        the event loop if any subscription is due
+        """
+        self._snapshot = snapshot = self._take_snapshot(simulation)
+
+        if time.monotonic() < self._next_publish:
+            return
+
+        # nobody else is due until the event loop has published these
+        self._next_publish = float("inf")
+
+        stats = {"stats": snapshot["stats"], "num": snapshot["num"]}
+        self._loop.call_soon_threadsafe(self._publish, stats)
+
+    def _publish(self, stats: dict) -> None:
+        """
+        send the stats to every subscriber that is due (event loop thread)
+        """
+        now = time.monotonic()
+
+        for client, subscription in list(self._subscriptions.items()):
+            if now > subscription.expires:
+                del self._subscriptions[client]
+                continue
+
+            if now < subscription.next_due:
+                continue
+
+            subscription.next_due = now + subscription.interval
+            subscription.sequence += 1
+
+            # only the sequence differs between subscribers
+            frame = Frame(stats, subscription.sequence, subscription.binary)
+            with suppress(Exception):
+                subscription.send(frame.encode())
+
+        self._update_next_publish()
+
+    async def _handle_stream(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        one TCP / unix socket client
+        """
+        def send(frame: bytes) -> None:
+            writer.write(_LENGTH.pack(len(frame)) + frame)
+
+        self._writers.add(writer)
+        try:
+            while True:
+                length, = _LENGTH.unpack(
+                    await reader.readexactly(_LENGTH.size)
+                )
+
+                # no frame is bigger than a datagram, don't buffer garbage
+                if length > MAX_DATAGRAM:
+                    print(f"INVALID FRAME LENGTH: {length}, disconnecting")
+                    break
+
+                reply = self.handle(
+                    await reader.readexactly(length),
+                    ("stream", id(writer)),
+                    send
+                )
+
+                if reply is not None:
+                    writer.write(_LENGTH.pack(len(reply)) + reply)
+                    await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+        finally:
+            self._writers.discard(writer)
+            self._subscriptions.pop(("stream", id(writer)), None)
+            self._update_next_publish()
+            writer.close()
+
+    # lifetime
+    async def _open(self) -> None:
+        if self.port is not None:
+            _, self._udp = await self._loop.create_datagram_endpoint(
+                lambda: _DatagramProtocol(self),
+                local_addr=(self.host, self.port)
+            )
+
+        if self.tcp_port is not None:
+            self._servers.append(await asyncio.start_server(
+                self._handle_stream, self.host, self.tcp_port
+            ))
+
+        if self.unix_path is not None:
+            self._servers.append(await asyncio.start_unix_server(
+                self._handle_stream, self.unix_path
+            ))
+
+    async def _close(self) -> None:
+        """
+        tell every known client that we are closing and stop listening
+        """
+        close = Frame({"close": 1}).encode()
+
+        if self._udp is not None:
+            for addr in self._udp.peers:
+                with suppress(Exception):
+                    self._udp.transport.sendto(close, addr)
+
+            self._udp.transport.close()
+
+        for writer in list(self._writers):
+            with suppress(Exception):
+                writer.write(_LENGTH.pack(len(close)) + close)
+                writer.close()
+
+        for server in self._servers:
+            server.close()
+
+    def _run(self, errors: list[BaseException], opened: Event) -> None:
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._open())
+
+        except OSError as e:
+            errors.append(e)
+            return
+
+        finally:
+            opened.set()
+
+        self._loop.run_forever()
+
+    def start(self) -> None:
+        """
+        open all sockets and start serving in a background thread, call it
+        from the simulation thread (or before the simulation runs)
+
+        :raises OSError: if a socket can't be opened
+        """
+        self._snapshot = self._take_snapshot(self.simulation)
+
+        errors: list[BaseException] = []
+        opened = Event()
+        self._thread = Thread(
+            target=self._run, args=(errors, opened), daemon=True
+        )
+        self._thread.start()
+
+        # wait until the sockets are open (or failed to)
+        opened.wait()
+
+        if errors:
+            raise errors[0]
+
+        self.simulation.step_hooks.append(self._on_step)
+
+    def stop(self) -> None:
+        """
+        stop serving, returns as soon as the sockets are closed
+        """
+        if self._thread is None or not self._loop.is_running():
+            return
+
+        self.simulation.step_hooks.remove(self._on_step)
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
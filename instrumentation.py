@@ -0,0 +1,141 @@
+"""
+instrumentation.py
+16. October 2026
+
+Low overhead per-phase timers and counters for the step loop
+
+Author:
+Nilusink
+"""
+from contextlib import contextmanager, nullcontext
+from collections import deque
+import typing as tp
+import threading
+import json
+import time
+import os
+
+
+# phases and counters reported over the control protocol, in this order
+PHASES = ("commands", "move", "broad", "collide", "strips", "stats", "hooks",
+          "render")
+COUNTERS = ("candidates", "pairs")
+
+_DISABLED = nullcontext()
+
+
+class Profiler:
+    """
+    sums the time spent in every phase (and the counters) per step and
+    keeps the last `window` steps
+
+    disabled it only costs an attribute check per phase. while tracing,
+    every single phase is also recorded for a Chrome trace
+    (chrome://tracing, Perfetto, speedscope)
+    """
+    def __init__(self, window: int = 120, trace_limit: int = 1_000_000) -> None:
+        """
+        :param window: number of steps to average over
+        :param trace_limit: most trace events kept (the oldest are dropped)
+        """
+        self.enabled = False
+        self.tracing = False
+        self.window = window
+
+        self._steps: deque[dict[str, float]] = deque(maxlen=window)
+        self._current: dict[str, float] = {}
+        self._trace: deque[dict[str, tp.Any]] = deque(maxlen=trace_limit)
+
+    def enable(self, enabled: bool = True) -> None:
+        """
+        turn the timers on or off, the window is cleared either way
+        """
+        self.enabled = enabled
+        self._steps.clear()
+        self._current = {}
+
+    def start_trace(self) -> None:
+        """
+        record every phase until `stop_trace` (also enables the timers)
+        """
+        self._trace.clear()
+        self.tracing = True
+        if not self.enabled:
+            self.enable()
+
+    def stop_trace(self) -> None:
+        self.tracing = False
+
+    def phase(self, name: str) -> tp.ContextManager:
+        """
+        time everything inside the `with` block as `name`
+        """
+        if not self.enabled:
+            return _DISABLED
+
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str) -> tp.Iterator[None]:
+        start = time.perf_counter_ns()
+        try:
+            yield
+
+        finally:
+            duration = time.perf_counter_ns() - start
+            self._current[name] = self._current.get(name, 0) + duration
+
+            if self.tracing:
+                self._trace.append({
+                    "name": name,
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": duration / 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                })
+
+    def count(self, name: str, value: int) -> None:
+        """
+        add `value` to a counter of the current step
+        """
+        if self.enabled:
+            self._current[name] = self._current.get(name, 0) + value
+
+    def end_step(self) -> None:
+        """
+        close the current step and move it into the window
+        """
+        if self.enabled:
+            self._steps.append(self._current)
+            self._current = {}
+
+    def summary(self) -> dict[str, float]:
+        """
+        average per step over the window: phases in ms, counters as is,
+        and the number of steps averaged over
+        """
+        steps = list(self._steps)
+        result = {"steps": float(len(steps))}
+
+        for name in PHASES:
+            total = sum(step.get(name, 0) for step in steps)
+            result[name] = total / max(len(steps), 1) / 1e6
+
+        for name in COUNTERS:
+            total = sum(step.get(name, 0) for step in steps)
+            result[name] = total / max(len(steps), 1)
+
+        return result
+
+    def export_chrome_trace(self, path: str) -> int:
+        """
+        write the recorded trace as Chrome trace JSON
+
+        :returns: number of events written
+        """
+        events = list(self._trace)
+        with open(path, "w") as out:
+            json.dump({"traceEvents": events}, out)
+
+        return len(events)
@@ -0,0 +1,413 @@
+"""
+kernels.py
+16. October 2026
+
+Optional compiled (Numba) kernels for moving, the grid broad phase and pair
+resolution, with the NumPy implementation as fallback
+
+Author:
+Nilusink
+"""
+from broad_phase import SpatialHash, Pairs, _sorted_pairs, make_broad_phase
+from collisions import resolve_collisions, touching_pairs
+from contextlib import suppress
+import typing as tp
+import numpy as np
+import itertools
+import argparse
+import math
+
+try:
+    import numba
+
+except ImportError:
+    numba = None
+
+
+if tp.TYPE_CHECKING:
+    from broad_phase import BroadPhase
+    from particles import ParticleArrays
+
+
+NUMBA_AVAILABLE = numba is not None
+
+if NUMBA_AVAILABLE:
+    _jit = numba.njit(cache=True)
+
+else:
+    # the kernels still run as plain (slow) python, e.g. for the parity check
+    def _jit(function):
+        return function
+
+
+@_jit
+def _move(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        radii: np.ndarray,
+        left: float,
+        right: float,
+        top: float,
+        bottom: float,
+        width: float,
+        height: float,
+        dt: float
+) -> None:
+    """
+    same as `move_particles`, one particle at a time
+    """
+    for k in range(len(positions)):
+        r = radii[k]
+        x = positions[k, 0] + velocities[k, 0] * dt
+        y = positions[k, 1] + velocities[k, 1] * dt
+
+        # Bounce off the walls
+        if x - r < left or x + r > right:
+            velocities[k, 0] = -velocities[k, 0]
+            x = min(max(x, r), width - r)
+
+        if y - r < top or y + r > bottom:
+            velocities[k, 1] = -velocities[k, 1]
+            y = min(max(y, r), height - r)
+
+        # check if oob
+        if x - r <= left:
+            x = left + r + 1
+
+        elif x + r >= right:
+            x = right - (r + 1)
+
+        if y - r <= top:
+            y = top + r + 1
+
+        elif y + r >= bottom:
+            y = bottom - (r + 1)
+
+        positions[k, 0] = x
+        positions[k, 1] = y
+
+
+@_jit
+def _grid_scan(
+        order: np.ndarray,
+        sorted_keys: np.ndarray,
+        width: int,
+        firsts: np.ndarray,
+        seconds: np.ndarray,
+        fill: bool
+) -> int:
+    """
+    walk the sorted cells and collect the pairs with the same and the
+    neighbouring cells (like `SpatialHash.pairs`)
+
+    run once with `fill=False` to count the pairs, then with arrays of that
+    size to fill them
+
+    :returns: number of pairs
+    """
+    n = len(sorted_keys)
+    neighbours = (1, -1 + width, width, 1 + width)
+    count = 0
+    for a in range(n):
+        key = sorted_keys[a]
+
+        # the rest of the own cell
+        b = a + 1
+        while b < n and sorted_keys[b] == key:
+            if fill:
+                firsts[count] = order[a]
+                seconds[count] = order[b]
+
+            count += 1
+            b += 1
+
+        for offset in neighbours:
+            b = np.searchsorted(sorted_keys, key + offset)
+            while b < n and sorted_keys[b] == key + offset:
+                if fill:
+                    firsts[count] = order[a]
+                    seconds[count] = order[b]
+
+                count += 1
+                b += 1
+
+    return count
+
+
+@_jit
+def _resolve(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        radii: np.ndarray,
+        masses: np.ndarray,
+        i: np.ndarray,
+        j: np.ndarray
+) -> int:
+    """
+    resolve the pairs one after the other, in order (same math as
+    `Particle.collide`)
+
+    gives the same result as the rounds of `resolve_pairs`, since both
+    resolve the pairs of every particle in the same order
+
+    :returns: number of pairs that actually touched
+    """
+    resolved = 0
+    for k in range(len(i)):
+        a = i[k]
+        b = j[k]
+
+        dx = positions[a, 0] - positions[b, 0]
+        dy = positions[a, 1] - positions[b, 1]
+        distance = math.hypot(dx, dy)
+        reach = radii[a] + radii[b]
+        if distance >= reach:
+            continue
+
+        # contact normal (pointing from b to a) and tangent
+        nx, ny = 1., 0.
+        if distance > 0:
+            nx = dx / distance
+            ny = dy / distance
+
+        tx, ty = ny, -nx
+
+        # move other out of way
+        positions[b, 0] = positions[a, 0] - nx * reach
+        positions[b, 1] = positions[a, 1] - ny * reach
+
+        # split the velocities in two directions (90°)
+        now_collision = velocities[a, 0] * nx + velocities[a, 1] * ny
+        now_carry = velocities[a, 0] * tx + velocities[a, 1] * ty
+        inf_collision = velocities[b, 0] * nx + velocities[b, 1] * ny
+        inf_carry = velocities[b, 0] * tx + velocities[b, 1] * ty
+
+        # 1D elastic collision along the normal
+        now_mass = masses[a]
+        inf_mass = masses[b]
+        total_mass = now_mass + inf_mass
+
+        now_v = now_collision * now_mass
+        now_v += (inf_collision * 2 - now_collision) * inf_mass
+        now_v /= total_mass
+
+        inf_v = inf_collision * inf_mass
+        inf_v += (now_collision * 2 - inf_collision) * now_mass
+        inf_v /= total_mass
+
+        # assign velocities
+        velocities[a, 0] = now_carry * tx + now_v * nx
+        velocities[a, 1] = now_carry * ty + now_v * ny
+        velocities[b, 0] = inf_carry * tx + inf_v * nx
+        velocities[b, 1] = inf_carry * ty + inf_v * ny
+
+        resolved += 1
+
+    return resolved
+
+
+class CompiledSpatialHash(SpatialHash):
+    """
+    `SpatialHash` with the neighbour walk in a compiled loop instead of
+    the repeat / searchsorted expansion
+    """
+    def pairs(self, particles: "ParticleArrays") -> Pairs:
+        if len(particles) < 2:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+        order, sorted_keys, width = self._sorted_cells(particles)
+
+        empty = np.empty(0, dtype=np.intp)
+        count = _grid_scan(order, sorted_keys, width, empty, empty, False)
+
+        firsts = np.empty(count, dtype=np.intp)
+        seconds = np.empty(count, dtype=np.intp)
+        _grid_scan(order, sorted_keys, width, firsts, seconds, True)
+
+        return _sorted_pairs(firsts, seconds)
+
+
+class Backend:
+    """
+    NumPy kernels, always available
+    """
+    name = "numpy"
+
+    def broad_phase(self, name: str) -> "BroadPhase":
+        """
+        broad phase by its name, as fast as this backend can do it
+        """
+        return make_broad_phase(name)
+
+    def move(self, particles: "ParticleArrays", dt: float) -> None:
+        particles.step_positions(dt)
+
+    def resolve(self, particles: "ParticleArrays", pairs: Pairs) -> int:
+        """
+        :returns: number of pairs that actually touched
+        """
+        return resolve_collisions(particles, pairs)
+
+
+class NumbaBackend(Backend):
+    """
+    compiled kernels (the first step is slow, it compiles them)
+    """
+    name = "numba"
+
+    def broad_phase(self, name: str) -> "BroadPhase":
+        if name == CompiledSpatialHash.name:
+            return CompiledSpatialHash()
+
+        return super().broad_phase(name)
+
+    def move(self, particles: "ParticleArrays", dt: float) -> None:
+        box = particles.box
+        width, height = box.world_size
+        _move(
+            particles.positions,
+            particles.velocities,
+            particles.radii,
+            box.left,
+            box.right,
+            box.top,
+            box.bottom,
+            width,
+            height,
+            dt
+        )
+
+    def resolve(self, particles: "ParticleArrays", pairs: Pairs) -> int:
+        positions = particles.positions
+        radii = particles.radii
+        i, j = touching_pairs(positions, radii, *pairs)
+
+        with particles.changing_velocities(np.union1d(i, j)):
+            return _resolve(
+                positions, particles.velocities, radii, particles.masses, i, j
+            )
+
+
+BACKENDS: dict[str, type[Backend]] = {
+    Backend.name: Backend,
+    NumbaBackend.name: NumbaBackend,
+}
+
+
+def make_backend(name: str) -> Backend:
+    """
+    create a backend by its name, "numba" falls back to "numpy" if numba
+    isn't installed
+    """
+    if name not in BACKENDS:
+        raise ValueError(
+            f"unknown backend \"{name}\", valid are: {', '.join(BACKENDS)}"
+        )
+
+    if name == NumbaBackend.name and not NUMBA_AVAILABLE:
+        name = Backend.name
+
+    return BACKENDS[name]()
+
+
+# largest position / velocity difference `check_parity` accepts
+PARITY_TOLERANCE = 1e-9
+
+
+def check_parity(
+        count: int = 200,
+        steps: int = 20,
+        seed: int = 0
+) -> dict[str, float]:
+    """
+    run every available backend next to `Particle.move` / `Particle.collide`
+    from the same start and compare
+
+    :returns: largest position or velocity difference per backend
+    """
+    from spawning import spawn_particles
+    from particles import ParticleArrays
+    from box import BOX
+
+    # `Particle.move` only knows the global box
+    with suppress(ValueError):
+        BOX.world_size = (1200, 800)
+
+    def spawn() -> "ParticleArrays":
+        store = ParticleArrays(box=BOX)
+        spawn_particles(store, count, 10, rng=np.random.default_rng(seed))
+        return store
+
+    reference = spawn()
+    names = [Backend.name]
+    if NUMBA_AVAILABLE:
+        names.append(NumbaBackend.name)
+
+    stores = {name: spawn() for name in names}
+    backends = {name: BACKENDS[name]() for name in names}
+    broad_phases = {name: backends[name].broad_phase("grid") for name in names}
+
+    for _ in range(steps):
+        for view in reference:
+            view.move()
+
+        # every touching i < j pair in the order the backends use, picked
+        # with the distance check of `Particle.collide` before resolving
+        views = list(reference)
+        touching = [
+            (a, b)
+            for a, b in itertools.combinations(views, 2)
+            if math.hypot(*(a.position - b.position).xy)
+            < a.radius + b.radius
+        ]
+        for a, b in touching:
+            a.collide(b)
+
+        for name in names:
+            backends[name].move(stores[name], 1)
+            backends[name].resolve(
+                stores[name],
+                broad_phases[name].pairs(stores[name])
+            )
+
+    return {
+        name: float(max(
+            np.abs(store.positions - reference.positions).max(),
+            np.abs(store.velocities - reference.velocities).max()
+        ))
+        for name, store in stores.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="compare the backends with Particle.move / collide"
+    )
+    parser.add_argument("-n", "--particles", type=int, default=200)
+    parser.add_argument("-s", "--steps", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=PARITY_TOLERANCE
+    )
+    args = parser.parse_args()
+
+    if not NUMBA_AVAILABLE:
+        print("numba is not installed, only checking the numpy backend")
+
+    failed = False
+    for name, difference in check_parity(
+            args.particles, args.steps, args.seed
+    ).items():
+        ok = difference <= args.tolerance
+        failed |= not ok
+        print(
+            f"{name}: largest difference {difference:.3g} "
+            f"({'ok' if ok else 'FAILED'})"
+        )
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,160 +7,174 @@ A gaß particle simulator
 Author:
 Nilusink
 """
-from contextlib import suppress
 from subprocess import Popen
-from threading import Thread
-import socket
+import typing as tp
 import pygame
-import json
 import sys
 
-from physics_calculations import pressure_from_particles, calculate_temperature
+from control_server import ControlServer
+from recorder import TrajectoryRecorder
+from spawning import spawn_particles
+from renderer import LODRenderer
+from simulation import Simulation
 from particles import particles
 from box import BOX
 
-# Initialize Pygame
-pygame.init()
-
 # Constants
 WIDTH, HEIGHT = 1200, 800
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 INITIAL_PARTICLE_COUNT = 60
+INITIAL_TEMPERATURE = 10
 PARTICLE_RADIUS_RANGE = (5, 10)
 FPS = 60
-
-# Screen setup
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Gas Particle Simulation")
-BOX.world_size = WIDTH, HEIGHT
-
-
-class Communicator:
-    running: bool = True
-
-    def __init__(self, host: str, port: int) -> None:
-        self.host = host
-        self.port = port
-
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self._socket.bind((self.host, self.port))
-        self._socket.settimeout(1)
-
-        Thread(target=self.receive).start()
-
-    def receive(self) -> None:
-        """
-        receive settings
-        """
-        while self.running:
-            try:
-                msg, addr = self._socket.recvfrom(1024)
-                data = json.loads(msg.decode('utf-8'))
-
-            except (TimeoutError, json.JSONDecodeError):
-                continue
-
-            # send close if not running anymore
-            if not self.running:
-                self._socket.sendto(json.dumps({
-                    "close": 1
-                }).encode('utf-8'), addr)
-
-            # parse request
-            answer: dict = {}
-            for key in data:
-                match key:
-                    case "vel":
-                        particles.multiply_speeds(data["vel"])
-
-                    case "len":
-                        BOX.set_length(data["len"])
-
-                    case "rvel":
-                        answer["vel"] = particles.get_av_energy()
-
-                    case "num":
-                        particles.change_particles(data["num"])
-
-                    case "rnum":
-                        answer["num"] = len(particles)
-
-                    case "rstats":
-                        p = pressure_from_particles(
-                            particles, BOX.volume
-                        )
-                        t = calculate_temperature(
-                            particles,
-                            BOX.volume,
-                            p
-                        )
-                        answer["stats"] = {
-                            "p": p,
-                            "t": t,
-                            "l": BOX.size.x
-                        }
-
-                    case _:
-                        print(f"INVALID KEY: \"{key}\"")
-
-            # if anything has been requested, send answer
-            if answer:
-                # we don't care if there was an error sending, so just ignore
-                # all possible errors
-                with suppress(Exception):
-                    self._socket.sendto(
-                        json.dumps(answer).encode('utf-8'), addr
-                    )
+PHYSICS_RATE = 60  # physics steps per second, independent of FPS
+POINT_THRESHOLD = 5_000  # draw single pixels from this many particles on
+HEATMAP_THRESHOLD = 20_000  # draw a density heatmap from this many on
+RENDER_EVERY = 1  # only render every k-th physics step
+BROAD_PHASE = "grid"  # "grid", "sap" or "brute"
+WORKERS = 1  # processes for the physics, > 1 splits the box into strips
+BACKEND = "numpy"  # "numba" for compiled kernels (if installed)
+SEED = None  # same seed, same run (None for a random one)
+TRACE_PATH = "trace.json"  # chrome trace written after pressing T twice
+CHECKPOINT_PATH = "checkpoint.gps"  # saved with S, loaded with L
+TRAJECTORY_PATH = None  # ring buffer file to record the trajectory into
+TRAJECTORY_FRAMES = 3600  # frames kept in the ring buffer
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 24323  # UDP, used by the settings GUI
+CONTROL_TCP_PORT = None  # optional TCP port for more clients
+CONTROL_UNIX_PATH = None  # optional unix socket
+
+
+def try_checkpoint(action: tp.Callable[[str], None]) -> None:
+    """
+    save / load `CHECKPOINT_PATH`, a missing or broken file is only reported
+    """
+    try:
+        action(CHECKPOINT_PATH)
+
+    except (OSError, ValueError) as e:
+        print(f"CHECKPOINT FAILED: {e}")
 
 
 def main() -> None:
+    # Initialize Pygame
+    pygame.init()
+
+    # Screen setup
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Gas Particle Simulation")
+
+    simulation = Simulation(
+        particles,
+        BOX,
+        (WIDTH, HEIGHT),
+        BROAD_PHASE,
+        PHYSICS_RATE,
+        workers=WORKERS,
+        backend=BACKEND,
+        seed=SEED
+    )
+
     running = True
     clock = pygame.time.Clock()
-    particles.change_particles(INITIAL_PARTICLE_COUNT, False)
-
-    comm = Communicator("127.0.0.1", 24323)
+    renderer = LODRenderer(
+        WHITE,
+        POINT_THRESHOLD,
+        HEATMAP_THRESHOLD,
+        render_every=RENDER_EVERY
+    )
+    spawn_particles(particles, INITIAL_PARTICLE_COUNT, INITIAL_TEMPERATURE)
+
+    server = ControlServer(
+        simulation,
+        CONTROL_HOST,
+        CONTROL_PORT,
+        CONTROL_TCP_PORT,
+        CONTROL_UNIX_PATH
+    )
+    server.start()
+
+    recorder = None
+    if TRAJECTORY_PATH is not None:
+        # room for particles added later on
+        recorder = TrajectoryRecorder(
+            TRAJECTORY_PATH,
+            len(particles) * 4,
+            TRAJECTORY_FRAMES
+        )
+        recorder.attach(simulation)
 
     # start settings GUI
     Popen(f"{sys.executable} settings_gui.py")
 
-    while running:
-        # handle pygame events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                comm.running = False
-
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    particles.multiply_speeds(1.1)
-
-                elif event.key == pygame.K_DOWN:
-                    particles.multiply_speeds(.9)
+    try:
+        while running:
+            # handle pygame events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
 
-                elif event.key == pygame.K_a:
-                    particles.add_particle()
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_UP:
+                        simulation.command("vel", 1.1)
 
-                elif event.key == pygame.K_r:
-                    particles.remove_particle()
+                    elif event.key == pygame.K_DOWN:
+                        simulation.command("vel", .9)
 
-        screen.fill(WHITE)
+                    elif event.key == pygame.K_a:
+                        simulation.command("num", 1)
 
-        # update and draw particles
-        for i, particle in enumerate(particles):
-            particle.move()
+                    elif event.key == pygame.K_r:
+                        simulation.command("num", -1)
 
-            for other in particles[i + 1:]:
-                particle.collide(other)
+                    # checkpoints, applied between two steps
+                    elif event.key == pygame.K_s:
+                        simulation.schedule(
+                            lambda: try_checkpoint(simulation.save)
+                        )
 
-            particle.draw(screen)
+                    elif event.key == pygame.K_l:
+                        simulation.schedule(
+                            lambda: try_checkpoint(simulation.load)
+                        )
 
-        BOX.draw(screen)
+                    # profiler on / off
+                    elif event.key == pygame.K_p:
+                        profiler = simulation.profiler
+                        profiler.enable(not profiler.enabled)
+
+                    # start / stop recording a trace
+                    elif event.key == pygame.K_t:
+                        profiler = simulation.profiler
+                        if not profiler.tracing:
+                            profiler.start_trace()
+
+                        else:
+                            profiler.stop_trace()
+                            profiler.export_chrome_trace(TRACE_PATH)
+
+            # run the physics for the time the last frame took
+            alpha = simulation.advance(clock.tick(FPS) / 1000)
+
+            # draw particles in between the last two physics steps
+            if renderer.due(simulation.steps):
+                with simulation.profiler.phase("render"):
+                    dirty = renderer.render(
+                        screen,
+                        BOX,
+                        particles,
+                        simulation.interpolated_positions(alpha)
+                    )
+                    pygame.display.update(dirty)
 
-        pygame.display.flip()
-        clock.tick(FPS)
+    finally:
+        server.stop()
+        if recorder is not None:
+            recorder.close()
 
-    pygame.quit()
+        simulation.close()
+        pygame.quit()
 
 
 if __name__ == "__main__":
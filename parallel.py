@@ -0,0 +1,255 @@
+"""
+parallel.py
+16. October 2026
+
+Multi-core stepping: the box is split into vertical strips which are moved
+and collided by a process pool over shared memory
+
+Author:
+Nilusink
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collisions import touching_pairs, resolve_pairs
+from multiprocessing import shared_memory
+from broad_phase import make_broad_phase
+from particles import move_particles
+import multiprocessing as mp
+import typing as tp
+import numpy as np
+import os
+
+
+if tp.TYPE_CHECKING:
+    from broad_phase import BroadPhase
+    from particles import ParticleArrays
+
+
+# float64 columns per particle in the shared block. workers only read the
+# current state and only write the new one (double buffer), so they never
+# see each other's half-done changes
+_FIELDS: dict[str, int] = {
+    "positions": 2,
+    "velocities": 2,
+    "new_positions": 2,
+    "new_velocities": 2,
+    "radii": 1,
+    "masses": 1,
+}
+
+
+def _views(buffer: memoryview, capacity: int) -> dict[str, np.ndarray]:
+    """
+    numpy arrays on top of a shared memory block
+    """
+    views = {}
+    offset = 0
+    for name, width in _FIELDS.items():
+        shape = (capacity, width) if width > 1 else (capacity,)
+        views[name] = np.ndarray(shape, np.float64, buffer, offset)
+        offset += capacity * width * 8
+
+    return views
+
+
+# state of a worker process
+_memory: shared_memory.SharedMemory | None = None
+_arrays: dict[str, np.ndarray] = {}
+_broad_phase: "BroadPhase | None" = None
+
+
+def _attach(name: str, capacity: int, broad_phase: str) -> None:
+    """
+    worker initializer, maps the shared block
+    """
+    global _memory, _arrays, _broad_phase
+    _memory = shared_memory.SharedMemory(name)
+    _arrays = _views(_memory.buf, capacity)
+    _broad_phase = make_broad_phase(broad_phase)
+
+
+class _Strip:
+    """
+    the particles a worker sees (its own and the ghosts), in the shape the
+    broad phases expect
+    """
+    def __init__(self, positions: np.ndarray, radii: np.ndarray) -> None:
+        self.positions = positions
+        self.radii = radii
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+
+def _step_strip(
+        n: int,
+        x0: float,
+        x1: float,
+        ghost: float,
+        bounds: tuple[float, float, float, float],
+        world_size: tuple[int, int],
+        dt: float
+) -> int:
+    """
+    move and collide one strip (runs in a worker)
+
+    the strip owns the particles with `x0 <= x < x1`, everything up to
+    `ghost` further out is simulated as well (but not written back), so
+    pairs across the border are resolved the same way on both sides
+
+    :returns: number of touching pairs the strip owns
+    """
+    positions = _arrays["positions"][:n]
+    x = positions[:, 0]
+
+    # ascending, so local pairs are in the same order as global ones
+    local = np.flatnonzero((x >= x0 - ghost) & (x < x1 + ghost))
+    owned = (x[local] >= x0) & (x[local] < x1)
+
+    # private copies. ghosts are moved here too, that way no barrier is
+    # needed between moving and colliding
+    local_positions = positions[local]
+    local_velocities = _arrays["velocities"][local]
+    radii = _arrays["radii"][local]
+    masses = _arrays["masses"][local]
+
+    move_particles(
+        local_positions, local_velocities, radii, bounds, world_size, dt
+    )
+
+    i, j = touching_pairs(
+        local_positions,
+        radii,
+        *_broad_phase.pairs(_Strip(local_positions, radii))
+    )
+    touching = int(owned[i].sum())
+    resolve_pairs(local_positions, local_velocities, radii, masses, i, j)
+
+    targets = local[owned]
+    _arrays["new_positions"][targets] = local_positions[owned]
+    _arrays["new_velocities"][targets] = local_velocities[owned]
+
+    return touching
+
+
+class StripStepper:
+    """
+    does the move and collision phase of a sub-step on several processes
+
+    the box is split into one vertical strip per worker. ownership is
+    recomputed from the positions on every sub-step, so particles migrate
+    between strips just by crossing the border. the ghost zone is two
+    contact distances wide, only contact chains reaching further than that
+    are cut at the border, everything else gives the same result as the
+    single process path
+    """
+    def __init__(
+            self,
+            workers: int | None = None,
+            broad_phase: str = "grid"
+    ) -> None:
+        """
+        :param workers: number of processes (and strips), all cores if None
+        :param broad_phase: broad phase the workers use for their strip
+        """
+        self.workers = os.cpu_count() if workers is None else workers
+        self.broad_phase = broad_phase
+
+        self._memory: shared_memory.SharedMemory | None = None
+        self._arrays: dict[str, np.ndarray] = {}
+        self._capacity = 0
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _reserve(self, n: int) -> None:
+        """
+        make sure the shared block fits `n` particles, the workers are
+        restarted if it has to grow
+        """
+        if n <= self._capacity:
+            return
+
+        capacity = max(self._capacity, 64)
+        while capacity < n:
+            capacity *= 2
+
+        self.close()
+        self._memory = shared_memory.SharedMemory(
+            create=True,
+            size=capacity * sum(_FIELDS.values()) * 8
+        )
+        self._arrays = _views(self._memory.buf, capacity)
+        self._capacity = capacity
+
+        # spawn instead of fork, the control server runs in a thread
+        self._pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_attach,
+            initargs=(self._memory.name, capacity, self.broad_phase)
+        )
+
+    def substep(self, particles: "ParticleArrays", dt: float) -> int:
+        """
+        move and collide all particles
+
+        :returns: number of touching pairs
+        """
+        n = len(particles)
+        if n == 0:
+            return 0
+
+        self._reserve(n)
+        arrays = self._arrays
+        arrays["positions"][:n] = particles.positions
+        arrays["velocities"][:n] = particles.velocities
+        arrays["radii"][:n] = particles.radii
+        arrays["masses"][:n] = particles.masses
+
+        # everything that can touch an owned particle after moving it (the
+        # +2 covers the push back from the walls), twice, so the partners
+        # of ghosts are simulated too
+        reach = 2 * float(particles.radii.max()) \
+            + 2 * float(particles.speeds().max()) * dt + 2
+        ghost = 2 * reach
+
+        box = particles.box
+        bounds = (box.left, box.right, box.top, box.bottom)
+        edges = np.linspace(box.left, box.right, self.workers + 1)
+        edges[0], edges[-1] = -np.inf, np.inf
+
+        futures = [
+            self._pool.submit(
+                _step_strip,
+                n,
+                edges[k],
+                edges[k + 1],
+                ghost,
+                bounds,
+                box.world_size,
+                dt
+            )
+            for k in range(self.workers)
+        ]
+        touching = sum(future.result() for future in futures)
+
+        with particles.changing_velocities(np.arange(n)):
+            particles.positions[:] = arrays["new_positions"][:n]
+            particles.velocities[:] = arrays["new_velocities"][:n]
+
+        return touching
+
+    def close(self) -> None:
+        """
+        stop the workers and free the shared block
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+        # views have to be gone before the block can be closed
+        self._arrays = {}
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+        self._capacity = 0
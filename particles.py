@@ -8,97 +8,436 @@ Author:
 Nilusink
 """
 from physics_calculations import pressure_from_particles, calculate_temperature
+from species import SPECIES, SpeciesRegistry
+from contextlib import contextmanager
+from stats import RunningStats
 from vectors import Vec2
-from box import BOX
-import pygame as pg
+from box import BOX, _Box
 import typing as tp
 import numpy as np
-import random
 import math
 
 
-class Particles(list):
-    def __init__(self) -> None:
-        super().__init__()
+def move_particles(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        radii: np.ndarray,
+        bounds: tuple[float, float, float, float],
+        world_size: tuple[int, int],
+        dt: float = 1
+) -> None:
+    """
+    move particles by `velocity * dt` and bounce them off the walls, in
+    place (vectorized version of `Particle.move`)
+
+    :param bounds: left, right, top and bottom of the box
+    """
+    left, right, top, bottom = bounds
+    width, height = world_size
+
+    positions += velocities * dt
+    x = positions[:, 0]
+    y = positions[:, 1]
+
+    # Bounce off the walls
+    hit = (x - radii < left) | (x + radii > right)
+    velocities[hit, 0] *= -1
+    x[hit] = np.clip(x[hit], radii[hit], width - radii[hit])
+
+    hit = (y - radii < top) | (y + radii > bottom)
+    velocities[hit, 1] *= -1
+    y[hit] = np.clip(y[hit], radii[hit], height - radii[hit])
+
+    # check if oob
+    low = x - radii <= left
+    high = ~low & (x + radii >= right)
+    x[low] = left + radii[low] + 1
+    x[high] = right - (radii[high] + 1)
+
+    low = y - radii <= top
+    high = ~low & (y + radii >= bottom)
+    y[low] = top + radii[low] + 1
+    y[high] = bottom - (radii[high] + 1)
+
+
+class ParticleArrays:
+    """
+    structure-of-arrays particle storage
+
+    positions, velocities, radii, masses and colors are kept in contiguous
+    numpy arrays. indexing / iterating yields `ParticleView` objects, so code
+    written against the old list of `Particle` objects keeps working
+
+    per-species running sums (`stats`) are updated whenever velocities
+    change through the store, so writes to `velocities` from outside have
+    to go through `changing_velocities` (or be followed by `reset_stats`)
+    """
+    _fields: tuple[str, ...] = (
+        "_positions", "_velocities", "_radii", "_masses", "_colors", "_species"
+    )
+
+    def __init__(
+            self,
+            capacity: int = 64,
+            box: _Box = BOX,
+            species: SpeciesRegistry = SPECIES
+    ) -> None:
+        self.box = box
+        self.species = species
+        self._n = 0
+        self._positions = np.zeros((capacity, 2), dtype=np.float64)
+        self._velocities = np.zeros((capacity, 2), dtype=np.float64)
+        self._radii = np.zeros(capacity, dtype=np.float64)
+        self._masses = np.zeros(capacity, dtype=np.float64)
+        self._colors = np.zeros((capacity, 3), dtype=np.uint8)
+        self._species = np.zeros(capacity, dtype=np.intp)
+        self.stats = RunningStats()
+        self.rng = np.random.default_rng()
+
+    # array access (views, only valid until the next resize)
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions[:self._n]
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return self._velocities[:self._n]
+
+    @property
+    def radii(self) -> np.ndarray:
+        return self._radii[:self._n]
+
+    @property
+    def masses(self) -> np.ndarray:
+        return self._masses[:self._n]
+
+    @property
+    def colors(self) -> np.ndarray:
+        return self._colors[:self._n]
+
+    @property
+    def species_ids(self) -> np.ndarray:
+        """
+        species id of every particle (see `species`)
+        """
+        return self._species[:self._n]
+
+    @property
+    def capacity(self) -> int:
+        return len(self._radii)
+
+    # storage management
+    def _reserve(self, count: int) -> None:
+        """
+        make sure `count` more particles fit without reallocating
+        """
+        needed = self._n + count
+        if needed <= self.capacity:
+            return
+
+        new_capacity = max(needed, 2 * self.capacity)
+        for name in self._fields:
+            old = getattr(self, name)
+            new = np.zeros((new_capacity, *old.shape[1:]), dtype=old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def append(self, particle: "Particle", species: int | None = None) -> None:
+        """
+        copy a single `Particle` into the store
+
+        :param species: species id, looked up by mass and radius if not given
+        """
+        if species is None:
+            species = self.species.match(
+                particle.mass, particle.radius, particle.color
+            )
+
+        self._reserve(1)
+        i = self._n
+
+        self._positions[i] = particle.position.xy
+        self._velocities[i] = particle.velocity.xy
+        self._radii[i] = particle.radius
+        self._masses[i] = particle.mass
+        self._colors[i] = particle.color
+        self._species[i] = species
+        self._n += 1
+
+        self.stats.add(*self._stats_args(i))
+
+    def append_arrays(
+            self,
+            positions: np.ndarray,
+            velocities: np.ndarray,
+            species: np.ndarray
+    ) -> None:
+        """
+        append many particles at once, mass, radius and color are taken from
+        their species
+        """
+        count = len(species)
+        self._reserve(count)
+        new = slice(self._n, self._n + count)
+
+        self._positions[new] = positions
+        self._velocities[new] = velocities
+        self._radii[new] = self.species.radii[species]
+        self._masses[new] = self.species.masses[species]
+        self._colors[new] = self.species.colors[species]
+        self._species[new] = species
+        self._n += count
+
+        self.stats.add(*self._stats_args(np.arange(new.start, new.stop)))
+
+    def pop(self) -> None:
+        """
+        remove the last particle
+        """
+        if self._n == 0:
+            raise IndexError("pop from empty ParticleArrays")
+
+        self.stats.remove(*self._stats_args(self._n - 1))
+        self._n -= 1
+
+    def clear(self) -> None:
+        self._n = 0
+        self.reset_stats()
+
+    def restore(
+            self,
+            positions: np.ndarray,
+            velocities: np.ndarray,
+            radii: np.ndarray,
+            masses: np.ndarray,
+            colors: np.ndarray,
+            species_ids: np.ndarray,
+            stats: RunningStats | None = None
+    ) -> None:
+        """
+        replace all particles with the given arrays, which are used as
+        they are (e.g. memory maps) until the store has to grow
+
+        :param stats: running stats matching the arrays, recomputed if not
+            given
+        """
+        self._n = len(positions)
+        self._positions = positions
+        self._velocities = velocities
+        self._radii = radii
+        self._masses = masses
+        self._colors = colors
+        self._species = species_ids
+
+        if stats is None:
+            self.reset_stats()
+
+        else:
+            self.stats = stats
+
+    # running stats
+    def _stats_args(
+            self,
+            indices: int | np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        indices = np.atleast_1d(indices)
+        return (
+            self.species_ids[indices],
+            self.masses[indices],
+            self.velocities[indices]
+        )
+
+    @contextmanager
+    def changing_velocities(
+            self,
+            indices: int | np.ndarray
+    ) -> tp.Iterator[None]:
+        """
+        keep the running stats right while the velocities of `indices` are
+        changed inside the `with` block
+        """
+        self.stats.remove(*self._stats_args(indices))
+        try:
+            yield
+
+        finally:
+            self.stats.add(*self._stats_args(indices))
+
+    def reset_stats(self) -> None:
+        """
+        recompute the running stats from all particles
+        """
+        self.stats.reset(self.species_ids, self.masses, self.velocities)
+
+    def species_indices(self) -> list[np.ndarray]:
+        """
+        particle indices grouped by species (entry `i` belongs to species
+        id `i`)
+        """
+        ids = self.species_ids
+        order = np.argsort(ids, kind="stable")
+        counts = np.bincount(ids, minlength=len(self.species))
+
+        return np.split(order, np.cumsum(counts)[:-1])
+
+    # list compatibility
+    def __len__(self) -> int:
+        return self._n
+
+    def __iter__(self) -> tp.Iterator["ParticleView"]:
+        for i in range(self._n):
+            yield ParticleView(self, i)
+
+    @tp.overload
+    def __getitem__(self, item: int) -> "ParticleView": ...
+
+    @tp.overload
+    def __getitem__(self, item: slice) -> list["ParticleView"]: ...
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [ParticleView(self, i) for i in range(*item.indices(self._n))]
+
+        if item < 0:
+            item += self._n
+
+        if not 0 <= item < self._n:
+            raise IndexError("particle index out of range")
+
+        return ParticleView(self, item)
 
+    # simulation interface
     def change_particles(self, count: int, recalculate: bool = True) -> None:
         """
         create or delete multiple particles
         """
-        for _ in range(count):
-            self.add_particle(recalculate)
+        if count > 0:
+            self.add_particles(count, recalculate)
 
-        for _ in range(0, count, -1):
-            self.remove_particle(recalculate)
+        elif count < 0:
+            self.remove_particles(-count, recalculate)
 
-    def add_particle(self, recalculate: bool = True) -> None:
+    def add_particles(self, count: int, recalculate: bool = True) -> None:
         """
-        add a single particle
+        add `count` random particles at once, the box is only resized once
         """
-        x = random.randint(BOX.left + 30, BOX.right - 30)
-        y = random.randint(BOX.top + 30, BOX.bottom - 30)
+        bevore_press = pressure_from_particles(self, self.box.volume)
+
+        x = self.rng.integers(
+            self.box.left + 30, self.box.right - 30, count, endpoint=True
+        )
+        y = self.rng.integers(
+            self.box.top + 30, self.box.bottom - 30, count, endpoint=True
+        )
+        species = self.rng.integers(0, len(self.species), count)
+
+        # new particles get the current average speed in a random direction
+        angles = self.rng.uniform(0, 2 * math.pi, count)
+        speed = self.get_av_speed()
+        velocities = np.stack((np.cos(angles), np.sin(angles)), axis=1)
+        velocities *= speed
+
+        self.append_arrays(np.stack((x, y), axis=1), velocities, species)
 
-        radius = random.choice([7, 15])
+        # can't solve for the volume without any pressure to keep
+        if recalculate and bevore_press:
+            self.box.recalculate_from_pressure(bevore_press, self)
 
-        angle = random.uniform(0, 2 * math.pi)
-        color = {7: (255, 0, 0), 15: (0, 0, 255)}[radius]
-        mass = {7: 7*10**(-23), 15: 15*10**(-23)}[radius]
+    def remove_particles(self, count: int, recalculate: bool = True) -> None:
+        """
+        remove the last `count` particles at once, the box is only resized
+        once
+        """
+        # cant remove last particle bcuz
+        count = min(count, self._n - 1)
+        if count <= 0:
+            return
 
-        bevore_press = pressure_from_particles(self, BOX.volume)
+        bevore_press = pressure_from_particles(self, self.box.volume)
 
-        self.append(Particle(
-            x,
-            y,
-            mass,
-            radius,
-            self.get_av_speed(),
-            angle,
-            color
+        self.stats.remove(*self._stats_args(
+            np.arange(self._n - count, self._n)
         ))
+        self._n -= count
 
-        if recalculate:
-            BOX.recalculate_from_pressure(bevore_press, self)
+        # no pressure to keep (e.g. all particles stopped)
+        if recalculate and bevore_press:
+            self.box.recalculate_from_pressure(bevore_press, self)
+
+    def add_particle(self, recalculate: bool = True) -> None:
+        """
+        add a single particle
+        """
+        self.add_particles(1, recalculate)
 
     def remove_particle(self, recalculate: bool = True) -> None:
         """
         remove a single particle
         """
-        # cant remove last particle bcuz
-        if len(self) > 1:
-            bevore_press = pressure_from_particles(self, BOX.volume)
-            self.pop()
+        self.remove_particles(1, recalculate)
+
+    def step_positions(self, dt: float = 1) -> None:
+        """
+        move every particle by `velocity * dt` and bounce them off the box
+        walls (vectorized version of `Particle.move`)
+        """
+        move_particles(
+            self.positions,
+            self.velocities,
+            self.radii,
+            (self.box.left, self.box.right, self.box.top, self.box.bottom),
+            self.box.world_size,
+            dt
+        )
+
+    def draw(self, screen, positions: np.ndarray | None = None) -> None:
+        """
+        draw all particles, optionally at different (e.g. interpolated)
+        positions
+        """
+        # pygame is only needed for drawing, the simulation runs without it
+        import pygame as pg
 
-            if recalculate:
-                BOX.recalculate_from_pressure(bevore_press, self)
+        if positions is None:
+            positions = self.positions
+
+        for position, radius, color in zip(
+                positions.tolist(),
+                self.radii.tolist(),
+                self.colors.tolist()
+        ):
+            pg.draw.circle(screen, color, position, radius + 1)
 
     def multiply_speeds(self, mult: float) -> None:
         """
         multiply all particle speeds
         """
-        for particle in self:
-            particle.velocity *= mult
+        self.velocities[:] *= mult
+        self.stats.scale(mult)
+
+    def speeds(self) -> np.ndarray:
+        """
+        absolute velocity of every particle
+        """
+        return np.hypot(self.velocities[:, 0], self.velocities[:, 1])
 
     def get_av_speed(self) -> float:
         """
         get the average particle speed
         """
-        speeds = [p.velocity.length for p in self]
-
-        if len(speeds) == 0:
+        if self._n == 0:
             return 2
 
-        return sum(speeds) / len(speeds)
+        return self.stats.speed_total / self._n
 
     def get_av_energy(self) -> float:
         """
         average particle energy
         """
-        speeds = [p.velocity.length * p.mass for p in self]
-
-        if len(speeds) == 0:
+        if self._n == 0:
             return 0
 
-        return sum(speeds) / len(speeds)
+        return self.stats.momentum_total / self._n
 
 
 # Particle class
@@ -111,35 +450,45 @@ class Particle:
         self.mass = mass
 
     def move(self):
-        self.position += self.velocity
+        # work on local copies, so subclasses storing the vectors elsewhere
+        # only have to handle plain assignments
+        position = self.position
+        velocity = self.velocity
+        position += velocity
 
         # Bounce off the walls
-        if self.position.x - self.radius < BOX.left or self.position.x + self.radius > BOX.right:
-            self.velocity.angle = math.pi - self.velocity.angle
-            self.position.x = max(self.radius, min(
-                self.position.x, BOX.world_width - self.radius
+        if position.x - self.radius < BOX.left or position.x + self.radius > BOX.right:
+            velocity.angle = math.pi - velocity.angle
+            position.x = max(self.radius, min(
+                position.x, BOX.world_width - self.radius
             ))
 
-        if self.position.y - self.radius < BOX.top or self.position.y + self.radius > BOX.bottom:
-            self.velocity.angle = -self.velocity.angle
-            self.position.y = max(self.radius, min(
-                self.position.y, BOX.world_height - self.radius
+        if position.y - self.radius < BOX.top or position.y + self.radius > BOX.bottom:
+            velocity.angle = -velocity.angle
+            position.y = max(self.radius, min(
+                position.y, BOX.world_height - self.radius
             ))
 
         # check if oob
-        if self.position.x - self.radius <= BOX.left:
-            self.position.x = BOX.left + self.radius + 1
+        if position.x - self.radius <= BOX.left:
+            position.x = BOX.left + self.radius + 1
+
+        elif position.x + self.radius >= BOX.right:
+            position.x = BOX.right - (self.radius + 1)
 
-        elif self.position.x + self.radius >= BOX.right:
-            self.position.x = BOX.right - (self.radius + 1)
+        if position.y - self.radius <= BOX.top:
+            position.y = BOX.top + self.radius + 1
 
-        if self.position.y - self.radius <= BOX.top:
-            self.position.y = BOX.top + self.radius + 1
+        elif position.y + self.radius >= BOX.bottom:
+            position.y = BOX.bottom - (self.radius + 1)
 
-        elif self.position.y + self.radius >= BOX.bottom:
-            self.position.y = BOX.bottom - (self.radius + 1)
+        self.position = position
+        self.velocity = velocity
 
     def draw(self, screen):
+        # pygame is only needed for drawing, the simulation runs without it
+        import pygame as pg
+
         pg.draw.circle(screen, self.color, self.position.xy, self.radius+1)
 
     def collide(self, other: tp.Self):
@@ -188,5 +537,52 @@ class Particle:
             other.velocity = inf_v
 
 
+class ParticleView(Particle):
+    """
+    `Particle` compatible view onto a single row of a `ParticleArrays` store
+
+    reading `position` / `velocity` returns a fresh `Vec2`, assigning one
+    writes it back into the arrays
+    """
+    def __init__(self, store: ParticleArrays, index: int) -> None:
+        self._store = store
+        self._index = index
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def position(self) -> Vec2:
+        return Vec2.from_cartesian(*self._store.positions[self._index].tolist())
+
+    @position.setter
+    def position(self, value: Vec2) -> None:
+        self._store.positions[self._index] = value.xy
+
+    @property
+    def velocity(self) -> Vec2:
+        return Vec2.from_cartesian(
+            *self._store.velocities[self._index].tolist()
+        )
+
+    @velocity.setter
+    def velocity(self, value: Vec2) -> None:
+        with self._store.changing_velocities(self._index):
+            self._store.velocities[self._index] = value.xy
+
+    @property
+    def radius(self) -> float:
+        return float(self._store.radii[self._index])
+
+    @property
+    def mass(self) -> float:
+        return float(self._store.masses[self._index])
+
+    @property
+    def color(self) -> tuple[int, int, int]:
+        return tuple(self._store.colors[self._index].tolist())
+
+
 # global variables
-particles = Particles()
+particles = ParticleArrays()
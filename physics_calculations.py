@@ -8,6 +8,7 @@ Author:
 Nilusink
 """
 import typing as tp
+import numpy as np
 import math as m
 
 
@@ -15,29 +16,8 @@ if tp.TYPE_CHECKING:
     from particles import Particle
 
 
-def separate_particles(
-        particles: list["Particle"]
-) -> tuple[list["Particle"], list["Particle"]]:
-    """
-    separate particles by mass
-    """
-    p1s = []
-    p2s = []
-
-    # split particles based on mass
-    for particle in particles:
-        # whatever mass the first particle has is sorted into p1s
-        if len(p1s) == 0:
-            p1s.append(particle)
-            continue
-
-        if particle.mass == p1s[0].mass:
-            p1s.append(particle)
-
-        else:
-            p2s.append(particle)
-
-    return p1s, p2s
+AVOGADRO_CONSTANT = 6.022e23  # Avogadro's number in particles/mol
+GAS_CONSTANT = 8.314  # Ideal gas constant in J/(mol·K)
 
 
 # def pressure_from_particles(
@@ -111,6 +91,22 @@ def separate_particles(
 #     print(f"{volume=}")
 #     return volume
 
+def kinetic_sum(particles: list["Particle"]) -> float:
+    """
+    sum of m * v^2 over all particles
+
+    uses the running sums of the particle store if it keeps them (O(1)),
+    otherwise walks all particles
+    """
+    stats = getattr(particles, "stats", None)
+    if stats is not None:
+        return stats.mv2_total
+
+    # N_s * m_s * <v^2>_s summed over all species is just the sum over all
+    # particles, no need to split them by species
+    return sum([p.mass * p.velocity.length**2 for p in particles])
+
+
 def pressure_from_particles(particles: list["Particle"], volume: float) -> float:
     r"""
     calculate the pressure based off the particles
@@ -124,26 +120,16 @@ def pressure_from_particles(particles: list["Particle"], volume: float) -> float
     \langle v^2 \rangle: \text {mean square velocity} \newline
     $$
 
-    since we have two different types of molecules, we calculate two pressures
-    and add them together
+    with several types of molecules the partial pressures add up, which is
+    the same as summing m * v^2 over all particles
 
     :returns: pressure in Pascal
     """
     if not particles:
         return 0
 
-    p1s, p2s = separate_particles(particles)
-
-    # mean square velocities
-    ms1 = sum([p.velocity.length**2 for p in p1s]) / len(p1s) if p1s else 0
-    ms2 = sum([p.velocity.length**2 for p in p2s]) / len(p2s) if p2s else 0
-
-    # pressures
-    p1 = (len(p1s) / (3 * volume)) * p1s[0].mass * ms1 if p1s else 0
-    p2 = (len(p2s) / (3 * volume)) * p2s[0].mass * ms2 if p2s else 0
-
-    # add up pressures
-    return p1 + p2
+    # N_1 * m_1 * <v^2>_1 + N_2 * m_2 * <v^2>_2
+    return kinetic_sum(particles) / (3 * volume)
 
 
 def volume_from_pressure(particles: list["Particle"], pressure: float) -> float:
@@ -167,19 +153,8 @@ def volume_from_pressure(particles: list["Particle"], pressure: float) -> float:
     if not particles:
         return 0
 
-    p1s, p2s = separate_particles(particles)
-
-    # mean square velocities
-    ms1 = sum([p.velocity.length**2 for p in p1s]) / len(p1s) if p1s else 0
-    ms2 = sum([p.velocity.length**2 for p in p2s]) / len(p2s) if p2s else 0
-
-    N1 = len(p1s)
-    N2 = len(p2s)
-    m1 = p1s[0].mass if p1s else 0
-    m2 = p2s[0].mass if p2s else 0
-
     # Calculate volume
-    volume = (N1 * m1 * ms1 + N2 * m2 * ms2) / (3 * pressure)
+    volume = kinetic_sum(particles) / (3 * pressure)
 
     return volume
 
@@ -192,10 +167,28 @@ def calculate_temperature(particles: list["Particle"], volume: float, pressure:
         return 0
 
     N_total = len(particles)
-    Avogadro_constant = 6.022e23  # Avogadro's number in particles/mol
-    gas_constant = 8.314  # Ideal gas constant in J/(mol·K)
 
     # Calculate temperature
-    temperature = (pressure * volume * Avogadro_constant) / (N_total * gas_constant)
+    temperature = (pressure * volume * AVOGADRO_CONSTANT) / (N_total * GAS_CONSTANT)
 
     return temperature
+
+
+def velocity_sigma(
+        mass: float | np.ndarray,
+        temperature: float
+) -> float | np.ndarray:
+    r"""
+    standard deviation of a single velocity component for a Maxwell-Boltzmann
+    distribution, consistent with `calculate_temperature`
+
+    $$
+    T = { P V N_A \over N R } = { m \langle v^2 \rangle N_A \over 3 R }
+    \newline \ \newline
+    \langle v^2 \rangle = 2 \sigma^2 \Rightarrow
+    \sigma = \sqrt{ 3 R T \over 2 N_A m }
+    $$
+    """
+    return np.sqrt(
+        3 * GAS_CONSTANT * temperature / (2 * AVOGADRO_CONSTANT * mass)
+    )
@@ -0,0 +1,185 @@
+"""
+protocol.py
+16. October 2026
+
+Binary, versioned control protocol between the simulation and its clients
+(JSON is still understood as a fallback)
+
+A binary frame is a header followed by any number of commands:
+
+    header:  magic (3s) | version (B) | sequence (I) | command count (H)
+    command: type id (B) | payload length (H) | payload
+
+all values are big endian. unknown type ids can be skipped thanks to the
+payload length, so newer clients can talk to older simulations
+
+Author:
+Nilusink
+"""
+import typing as tp
+import struct
+import json
+
+
+MAGIC = b"GPS"
+VERSION = 1
+
+# biggest possible UDP payload, use this instead of 1024 when receiving
+MAX_DATAGRAM = 65507
+
+_HEADER = struct.Struct("!3sBIH")
+_COMMAND = struct.Struct("!BH")
+
+# key: (type id, payload format, field names if the value is a dict)
+MESSAGES: dict[str, tuple[int, str, tuple[str, ...] | None]] = {
+    # requests
+    "vel": (1, "!d", None),
+    "len": (2, "!d", None),
+    "num": (3, "!i", None),
+    "rvel": (4, "", None),
+    "rnum": (5, "", None),
+    "rstats": (6, "", None),
+    "sub": (7, "!d", None),  # stats pushes per second, 0 to unsubscribe
+    "prof": (8, "!B", None),  # 1 / 0 to turn the profiler on / off
+    "rprof": (9, "", None),
+
+    # answers ("vel" and "num" are also used as answers)
+    "stats": (64, "!ddd", ("p", "t", "l")),
+    "close": (65, "", None),
+    "profile": (66, "!" + "d" * 11, (
+        "steps", "commands", "move", "broad", "collide", "strips", "stats",
+        "hooks", "render", "candidates", "pairs"
+    )),
+}
+_BY_ID = {type_id: key for key, (type_id, *_) in MESSAGES.items()}
+
+
+class ProtocolError(ValueError):
+    """
+    raised for frames that can't be decoded
+    """
+
+
+class Frame:
+    """
+    a batch of commands (key, value) sent in one datagram
+    """
+    def __init__(
+            self,
+            commands: list[tuple[str, tp.Any]] | dict[str, tp.Any],
+            sequence: int = 0,
+            binary: bool = True
+    ) -> None:
+        """
+        :param commands: commands in order, a dict is also accepted
+        :param sequence: sequence number, answers repeat the one of the
+            request
+        :param binary: encode as binary frame (else JSON)
+        """
+        if isinstance(commands, dict):
+            commands = list(commands.items())
+
+        self.commands = commands
+        self.sequence = sequence
+        self.binary = binary
+
+    def encode(self) -> bytes:
+        """
+        encode the frame for sending
+        """
+        if not self.binary:
+            return json.dumps(dict(self.commands)).encode("utf-8")
+
+        parts = [_HEADER.pack(
+            MAGIC,
+            VERSION,
+            self.sequence & 0xFFFFFFFF,
+            len(self.commands)
+        )]
+        for key, value in self.commands:
+            if key not in MESSAGES:
+                raise ProtocolError(f"unknown command \"{key}\"")
+
+            type_id, fmt, fields = MESSAGES[key]
+            if not fmt:
+                payload = b""
+
+            elif fields is not None:
+                payload = struct.pack(fmt, *(value[f] for f in fields))
+
+            else:
+                payload = struct.pack(fmt, value)
+
+            parts.append(_COMMAND.pack(type_id, len(payload)))
+            parts.append(payload)
+
+        return b"".join(parts)
+
+    @classmethod
+    def decode(cls, data: bytes) -> tp.Self:
+        """
+        decode a received binary or JSON frame
+
+        :raises ProtocolError: if the data is neither
+        """
+        if not data.startswith(MAGIC):
+            try:
+                commands = json.loads(data.decode("utf-8"))
+
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise ProtocolError("invalid JSON frame") from e
+
+            if not isinstance(commands, dict):
+                raise ProtocolError("JSON frame has to be an object")
+
+            return cls(commands, binary=False)
+
+        try:
+            _, version, sequence, count = _HEADER.unpack_from(data)
+
+        except struct.error as e:
+            raise ProtocolError("truncated header") from e
+
+        if version != VERSION:
+            raise ProtocolError(f"unsupported protocol version {version}")
+
+        offset = _HEADER.size
+        commands = []
+        for _ in range(count):
+            try:
+                type_id, length = _COMMAND.unpack_from(data, offset)
+
+            except struct.error as e:
+                raise ProtocolError("truncated command") from e
+
+            offset += _COMMAND.size
+            payload = data[offset:offset + length]
+            offset += length
+
+            if len(payload) != length:
+                raise ProtocolError("truncated payload")
+
+            # unknown commands are passed on, so the receiver can report them
+            if type_id not in _BY_ID:
+                commands.append((f"#{type_id}", payload))
+                continue
+
+            key = _BY_ID[type_id]
+            _, fmt, fields = MESSAGES[key]
+            if not fmt:
+                commands.append((key, None))
+                continue
+
+            try:
+                values = struct.unpack(fmt, payload)
+
+            except struct.error as e:
+                raise ProtocolError(f"invalid payload for \"{key}\"") from e
+
+            if fields is not None:
+                commands.append((key, dict(zip(fields, values))))
+
+            else:
+                commands.append((key, values[0]))
+
+        return cls(commands, sequence)
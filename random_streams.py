@@ -0,0 +1,93 @@
+"""
+random_streams.py
+16. October 2026
+
+Seeded, independent random number streams for reproducible runs
+
+Author:
+Nilusink
+"""
+import typing as tp
+import numpy as np
+
+
+# one independent generator per purpose, so e.g. spawning more particles
+# doesn't change what a thermostat draws
+STREAMS = ("spawn", "thermostat", "workers")
+
+
+class RandomStreams:
+    """
+    all randomness of a simulation, derived from a single seed
+
+    the same seed gives the same numbers in every stream, no matter in
+    which order the streams are used
+    """
+    def __init__(self, seed: int | None = None) -> None:
+        """
+        :param seed: a random one is picked if not given (see `seed`)
+        """
+        self._sequence = np.random.SeedSequence(seed)
+        self._children = self._spawn_children()
+        self._generators = {
+            name: np.random.Generator(np.random.PCG64(child))
+            for name, child in self._children.items()
+        }
+
+    def _spawn_children(self) -> dict[str, np.random.SeedSequence]:
+        return dict(zip(STREAMS, self._sequence.spawn(len(STREAMS))))
+
+    @property
+    def seed(self) -> int:
+        """
+        the seed in use, pass it to repeat a run that wasn't seeded
+        """
+        return self._sequence.entropy
+
+    def __getitem__(self, name: str) -> np.random.Generator:
+        return self._generators[name]
+
+    @property
+    def spawn(self) -> np.random.Generator:
+        return self._generators["spawn"]
+
+    @property
+    def thermostat(self) -> np.random.Generator:
+        return self._generators["thermostat"]
+
+    def worker_generators(self, count: int) -> list[np.random.Generator]:
+        """
+        one independent generator per worker, the same ones for the same
+        seed and `count`
+        """
+        return [
+            np.random.Generator(np.random.PCG64(child))
+            for child in np.random.SeedSequence(
+                self._children["workers"].entropy,
+                spawn_key=self._children["workers"].spawn_key
+            ).spawn(count)
+        ]
+
+    # checkpoints
+    def state(self) -> dict[str, tp.Any]:
+        """
+        JSON compatible state of every stream
+        """
+        return {
+            "seed": self.seed,
+            "streams": {
+                name: generator.bit_generator.state
+                for name, generator in self._generators.items()
+            },
+        }
+
+    def set_state(self, state: dict[str, tp.Any]) -> None:
+        """
+        continue from a `state`, generators handed out before keep working
+        and continue from it too
+        """
+        self._sequence = np.random.SeedSequence(state["seed"])
+        self._children = self._spawn_children()
+
+        for name, stream_state in state["streams"].items():
+            self._generators[name].bit_generator.state = stream_state
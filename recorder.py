@@ -0,0 +1,410 @@
+"""
+recorder.py
+16. October 2026
+
+Trajectory recording: positions / velocities of every k-th step into a
+memory mapped ring buffer or a chunked file written by a background thread
+
+Author:
+Nilusink
+"""
+from threading import Thread
+import typing as tp
+import numpy as np
+import struct
+import queue
+import json
+import os
+
+
+if tp.TYPE_CHECKING:
+    from particles import ParticleArrays
+    from simulation import Simulation
+
+
+RING_MAGIC = b"GPSRING\0"
+STREAM_MAGIC = b"GPSTRAJ\0"
+VERSION = 1
+
+_PREFIX = struct.Struct("<8sII")
+_FRAME = struct.Struct("<qi")
+_ALIGN = 64
+
+DTYPES = ("float64", "float32", "float16", "int16")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _read_prefix(file: tp.BinaryIO) -> tuple[bytes, dict[str, tp.Any], int]:
+    """
+    :returns: tuple[magic, header, offset after the header]
+    """
+    prefix = file.read(_PREFIX.size)
+    if len(prefix) < _PREFIX.size:
+        raise ValueError("not a trajectory file")
+
+    magic, version, length = _PREFIX.unpack(prefix)
+    if magic not in (RING_MAGIC, STREAM_MAGIC):
+        raise ValueError("not a trajectory file")
+
+    if version != VERSION:
+        raise ValueError(f"unsupported trajectory version {version}")
+
+    header = json.loads(file.read(length).decode("utf-8"))
+
+    return magic, header, _PREFIX.size + length
+
+
+class TrajectoryRecorder:
+    """
+    records every `every`-th step, attached to a simulation as step hook
+
+    ring buffer (default): a preallocated memory mapped file holding the
+    last `frames` frames of up to `max_particles` particles each, a step
+    only costs copying the (quantized) arrays into it
+
+    background: frames are collected into chunks of `chunk_frames` which a
+    thread appends to the file, so it can grow without limit
+
+    int16 stores fixed point values (`value * scale`), the default scales
+    fit positions up to 2048 px and velocities up to 32 px per tick
+    """
+    def __init__(
+            self,
+            path: str,
+            max_particles: int,
+            frames: int = 1000,
+            every: int = 1,
+            dtype: str = "float32",
+            species: tp.Iterable[str | int] | None = None,
+            velocities: bool = True,
+            background: bool = False,
+            chunk_frames: int = 64,
+            position_scale: float = 16,
+            velocity_scale: float = 1024
+    ) -> None:
+        """
+        :param max_particles: particles per frame (ring buffer only, the
+            rest is cut off)
+        :param frames: number of frames in the ring buffer
+        :param every: record every k-th step
+        :param dtype: one of `DTYPES`
+        :param species: only record these species (names or ids)
+        :param velocities: also record the velocities
+        :param background: write chunks from a thread instead of the ring
+        :param chunk_frames: frames per chunk (background only)
+        """
+        if dtype not in DTYPES:
+            raise ValueError(
+                f"unknown dtype \"{dtype}\", valid are: {', '.join(DTYPES)}"
+            )
+
+        self.path = path
+        self.max_particles = max_particles
+        self.frames = frames
+        self.every = every
+        self.dtype = np.dtype(dtype)
+        self.velocities = velocities
+        self.background = background
+        self.chunk_frames = chunk_frames
+        self.position_scale = position_scale
+        self.velocity_scale = velocity_scale
+        self.recorded = 0
+
+        self._species = None if species is None else list(species)
+        self._species_ids: np.ndarray | None = None
+        self._simulation: "Simulation | None" = None
+
+        header = {
+            "dtype": self.dtype.str,
+            "velocities": velocities,
+            "filtered": species is not None,
+            "species": self._species,
+            "position_scale": position_scale,
+            "velocity_scale": velocity_scale,
+            "every": every,
+        }
+
+        if background:
+            self._chunk: list[bytes] = []
+            self._queue: queue.Queue[bytes | None] = queue.Queue(maxsize=16)
+            self._file = open(path, "wb")
+            self._write_prefix(self._file, STREAM_MAGIC, header)
+            self._thread = Thread(target=self._write_chunks, daemon=True)
+            self._thread.start()
+
+        else:
+            self._open_ring(header)
+
+    # file layout
+    @staticmethod
+    def _write_prefix(
+            file: tp.BinaryIO,
+            magic: bytes,
+            header: dict[str, tp.Any]
+    ) -> None:
+        encoded = json.dumps(header).encode("utf-8")
+        file.write(_PREFIX.pack(magic, VERSION, len(encoded)))
+        file.write(encoded)
+
+    @staticmethod
+    def _ring_layout(
+            header: dict[str, tp.Any],
+            start: int
+    ) -> dict[str, tuple[str, tuple[int, ...], int]]:
+        """
+        dtype, shape and offset of every ring buffer array
+        """
+        frames = header["frames"]
+        n = header["max_particles"]
+
+        arrays = [("steps", "<i8", (frames,)), ("counts", "<i4", (frames,))]
+        if header["filtered"]:
+            arrays.append(("ids", "<i4", (frames, n)))
+
+        arrays.append(("positions", header["dtype"], (frames, n, 2)))
+        if header["velocities"]:
+            arrays.append(("velocities", header["dtype"], (frames, n, 2)))
+
+        layout = {}
+        offset = _aligned(start)
+        for name, dtype, shape in arrays:
+            layout[name] = (dtype, shape, offset)
+            offset = _aligned(offset + np.dtype(dtype).itemsize
+                              * int(np.prod(shape)))
+
+        layout["end"] = ("", (), offset)
+
+        return layout
+
+    def _open_ring(self, header: dict[str, tp.Any]) -> None:
+        header["frames"] = self.frames
+        header["max_particles"] = self.max_particles
+
+        with open(self.path, "wb") as file:
+            self._write_prefix(file, RING_MAGIC, header)
+            start = file.tell()
+
+        layout = self._ring_layout(header, start)
+
+        # preallocate the whole file
+        with open(self.path, "r+b") as file:
+            file.truncate(layout.pop("end")[2])
+
+        self._ring = {
+            name: np.memmap(self.path, dtype, "r+", offset, shape)
+            for name, (dtype, shape, offset) in layout.items()
+        }
+        self._ring["steps"][:] = -1
+
+    # recording
+    def attach(self, simulation: "Simulation") -> None:
+        """
+        record the steps of `simulation` from now on
+        """
+        self._simulation = simulation
+        simulation.step_hooks.append(self)
+
+    def __call__(self, simulation: "Simulation") -> None:
+        if simulation.steps % self.every == 0:
+            self.record(simulation.steps, simulation.particles)
+
+    def _quantize(self, values: np.ndarray, scale: float) -> np.ndarray:
+        if self.dtype.kind != "i":
+            return values.astype(self.dtype)
+
+        scaled = np.rint(values * scale)
+        np.clip(scaled, -32768, 32767, out=scaled)
+
+        return scaled.astype(self.dtype)
+
+    def record(self, step: int, particles: "ParticleArrays") -> None:
+        """
+        add one frame
+        """
+        positions = particles.positions
+        velocities = particles.velocities
+
+        ids = None
+        if self._species is not None:
+            if self._species_ids is None:
+                self._species_ids = np.array([
+                    s if isinstance(s, int) else particles.species.id_of(s)
+                    for s in self._species
+                ])
+
+            ids = np.flatnonzero(
+                np.isin(particles.species_ids, self._species_ids)
+            )
+            positions = positions[ids]
+            velocities = velocities[ids]
+
+        if self.background:
+            self._record_chunk(step, ids, positions, velocities)
+
+        else:
+            self._record_ring(step, ids, positions, velocities)
+
+        self.recorded += 1
+
+    def _record_ring(
+            self,
+            step: int,
+            ids: np.ndarray | None,
+            positions: np.ndarray,
+            velocities: np.ndarray
+    ) -> None:
+        ring = self._ring
+        slot = self.recorded % self.frames
+        count = min(len(positions), self.max_particles)
+
+        ring["positions"][slot, :count] = self._quantize(
+            positions[:count], self.position_scale
+        )
+        if self.velocities:
+            ring["velocities"][slot, :count] = self._quantize(
+                velocities[:count], self.velocity_scale
+            )
+
+        if ids is not None:
+            ring["ids"][slot, :count] = ids[:count]
+
+        ring["counts"][slot] = count
+
+        # written last, a frame only counts once its step is set
+        ring["steps"][slot] = step
+
+    def _record_chunk(
+            self,
+            step: int,
+            ids: np.ndarray | None,
+            positions: np.ndarray,
+            velocities: np.ndarray
+    ) -> None:
+        parts = [_FRAME.pack(step, len(positions))]
+        if ids is not None:
+            parts.append(ids.astype("<i4").tobytes())
+
+        parts.append(self._quantize(positions, self.position_scale).tobytes())
+        if self.velocities:
+            parts.append(
+                self._quantize(velocities, self.velocity_scale).tobytes()
+            )
+
+        self._chunk.append(b"".join(parts))
+        if len(self._chunk) >= self.chunk_frames:
+            self._queue.put(b"".join(self._chunk))
+            self._chunk = []
+
+    def _write_chunks(self) -> None:
+        """
+        background thread, appends chunks until it gets None
+        """
+        while (chunk := self._queue.get()) is not None:
+            self._file.write(chunk)
+
+    def close(self) -> None:
+        """
+        detach, write everything that is left and close the file
+        """
+        if self._simulation is not None:
+            self._simulation.step_hooks.remove(self)
+            self._simulation = None
+
+        if self.background:
+            if self._chunk:
+                self._queue.put(b"".join(self._chunk))
+                self._chunk = []
+
+            self._queue.put(None)
+            self._thread.join()
+            self._file.close()
+
+        else:
+            for array in self._ring.values():
+                array.flush()
+
+            self._ring = {}
+
+
+def read_frames(path: str) -> tp.Iterator[dict[str, tp.Any]]:
+    """
+    read a recorded trajectory (either format), oldest frame first
+
+    :returns: per frame a dict with "step", "positions", "velocities" (None
+        if not recorded) and "ids" (particle indices, None if all particles
+        were recorded) with the quantization undone
+    """
+    with open(path, "rb") as file:
+        magic, header, start = _read_prefix(file)
+
+    dtype = np.dtype(header["dtype"])
+    integer = dtype.kind == "i"
+
+    def restore(values: np.ndarray, scale: float) -> np.ndarray:
+        if integer:
+            return values / scale
+
+        return values.astype(np.float64)
+
+    def frame(step, count, ids, positions, velocities) -> dict[str, tp.Any]:
+        return {
+            "step": int(step),
+            "ids": None if ids is None else np.array(ids[:count]),
+            "positions": restore(
+                positions[:count], header["position_scale"]
+            ),
+            "velocities": None if velocities is None else restore(
+                velocities[:count], header["velocity_scale"]
+            ),
+        }
+
+    if magic == RING_MAGIC:
+        layout = TrajectoryRecorder._ring_layout(header, start)
+        layout.pop("end")
+        ring = {
+            name: np.memmap(path, array_dtype, "r", offset, shape)
+            for name, (array_dtype, shape, offset) in layout.items()
+        }
+
+        steps = ring["steps"]
+        for slot in np.argsort(steps, kind="stable"):
+            if steps[slot] < 0:
+                continue
+
+            yield frame(
+                steps[slot],
+                int(ring["counts"][slot]),
+                ring["ids"][slot] if "ids" in ring else None,
+                ring["positions"][slot],
+                ring["velocities"][slot] if "velocities" in ring else None
+            )
+
+        return
+
+    if os.path.getsize(path) <= start:
+        return
+
+    data = np.memmap(path, np.uint8, "r", start)
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        step, count = _FRAME.unpack_from(data, offset)
+        offset += _FRAME.size
+
+        ids = None
+        if header["filtered"]:
+            ids = np.frombuffer(data, "<i4", count, offset)
+            offset += 4 * count
+
+        positions = np.frombuffer(data, dtype, 2 * count, offset)
+        offset += dtype.itemsize * 2 * count
+
+        velocities = None
+        if header["velocities"]:
+            velocities = np.frombuffer(data, dtype, 2 * count, offset)
+            offset += dtype.itemsize * 2 * count
+            velocities = velocities.reshape(count, 2)
+
+        yield frame(step, count, ids, positions.reshape(count, 2), velocities)
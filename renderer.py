@@ -0,0 +1,271 @@
+"""
+renderer.py
+16. October 2026
+
+Batched pygame rendering for large particle counts
+
+Author:
+Nilusink
+"""
+import typing as tp
+import numpy as np
+import pygame
+
+
+if tp.TYPE_CHECKING:
+    from particles import ParticleArrays
+    from box import _Box
+
+
+class SpriteRenderer:
+    """
+    draws all particles with a single `Surface.blits` call
+
+    every (color, radius) combination is rendered once into a sprite, and
+    only the region around the box is redrawn and updated on screen
+    """
+    def __init__(self, background: tuple[int, int, int]) -> None:
+        self.background = background
+        self._sprites: dict[tuple[tuple[int, ...], float], pygame.Surface] = {}
+        self._last_region: pygame.Rect | None = None
+
+    def sprite(
+            self,
+            color: tuple[int, ...],
+            radius: float
+    ) -> pygame.Surface:
+        """
+        pre-rendered circle (same size as `Particle.draw` would draw it)
+        """
+        key = (color, radius)
+        if key not in self._sprites:
+            size = int(2 * (radius + 1)) + 1
+
+            # color keyed (RLE) surfaces blit a lot faster than per-pixel
+            # alpha ones
+            transparent = (255, 0, 255)
+            if color == transparent:
+                transparent = (0, 0, 0)
+
+            surface = pygame.Surface((size, size))
+            surface.fill(transparent)
+            surface.set_colorkey(transparent, pygame.RLEACCEL)
+            pygame.draw.circle(
+                surface, color, (size // 2, size // 2), radius + 1
+            )
+            self._sprites[key] = surface
+
+        return self._sprites[key]
+
+    def draw_particles(
+            self,
+            screen: pygame.Surface,
+            particles: "ParticleArrays",
+            positions: np.ndarray | None = None
+    ) -> None:
+        """
+        blit every particle, optionally at different (e.g. interpolated)
+        positions
+        """
+        if positions is None:
+            positions = particles.positions
+
+        # one sprite per species, looked up through the species ids
+        sprites = [
+            self.sprite(tuple(int(c) for c in s.color), s.radius)
+            for s in particles.species
+        ]
+        offsets = np.array([s.get_width() // 2 for s in sprites])
+
+        ids = particles.species_ids
+        corners = (np.rint(positions) - offsets[ids, None]).astype(int)
+        corners = corners.tolist()
+        screen.blits(
+            [(sprites[i], corner) for i, corner in zip(ids.tolist(), corners)],
+            doreturn=False
+        )
+
+    def _draw_scene(
+            self,
+            screen: pygame.Surface,
+            box: "_Box",
+            particles: "ParticleArrays",
+            positions: np.ndarray | None
+    ) -> None:
+        self.draw_particles(screen, particles, positions)
+
+    def _region(self, box: "_Box", particles: "ParticleArrays") -> pygame.Rect:
+        """
+        everything that can change: the box, its border and particles
+        sticking out of it
+        """
+        margin = 4
+        if len(particles):
+            margin += int(particles.radii.max()) + 1
+
+        return pygame.Rect(box.pos.xy, box.size.xy).inflate(
+            2 * margin, 2 * margin
+        )
+
+    def render(
+            self,
+            screen: pygame.Surface,
+            box: "_Box",
+            particles: "ParticleArrays",
+            positions: np.ndarray | None = None
+    ) -> list[pygame.Rect]:
+        """
+        redraw the box region
+
+        :returns: dirty rects to pass to `pygame.display.update`
+        """
+        region = self._region(box, particles)
+        dirty = [region]
+
+        if self._last_region is None:
+            # first frame, clear everything
+            screen.fill(self.background)
+            dirty = [screen.get_rect()]
+
+        elif self._last_region != region:
+            # the box changed size, clear where it used to be
+            screen.fill(self.background, self._last_region)
+            dirty.append(self._last_region)
+
+        self._last_region = region
+
+        screen.fill(self.background, region)
+        screen.set_clip(region)
+        self._draw_scene(screen, box, particles, positions)
+        box.draw(screen)
+        screen.set_clip(None)
+
+        return dirty
+
+
+class LODRenderer(SpriteRenderer):
+    """
+    level of detail renderer for dense scenes
+
+    below `point_threshold` particles it draws sprites, above it single
+    pixels and above `heatmap_threshold` a density heatmap of the box, so
+    drawing costs O(pixels) instead of O(particles)
+    """
+    def __init__(
+            self,
+            background: tuple[int, int, int],
+            point_threshold: int = 5_000,
+            heatmap_threshold: int = 20_000,
+            heatmap_cell: int = 8,
+            render_every: int = 1
+    ) -> None:
+        """
+        :param point_threshold: particle count from which on pixels are drawn
+        :param heatmap_threshold: particle count from which on the heatmap
+            is drawn
+        :param heatmap_cell: size of a heatmap cell in pixels
+        :param render_every: only render every k-th physics step
+        """
+        super().__init__(background)
+        self.point_threshold = point_threshold
+        self.heatmap_threshold = heatmap_threshold
+        self.heatmap_cell = heatmap_cell
+        self.render_every = render_every
+        self._last_step: int | None = None
+
+    def mode(self, particles: "ParticleArrays") -> str:
+        """
+        "sprites", "points" or "heatmap"
+        """
+        if len(particles) >= self.heatmap_threshold:
+            return "heatmap"
+
+        if len(particles) >= self.point_threshold:
+            return "points"
+
+        return "sprites"
+
+    def due(self, step: int) -> bool:
+        """
+        check if a frame should be rendered for this physics step
+        """
+        # every frame, also the ones in between two steps (interpolation)
+        if self.render_every <= 1:
+            return True
+
+        if self._last_step is not None \
+                and step - self._last_step < self.render_every:
+            return False
+
+        self._last_step = step
+        return True
+
+    def draw_points(
+            self,
+            screen: pygame.Surface,
+            particles: "ParticleArrays",
+            positions: np.ndarray
+    ) -> None:
+        """
+        one pixel per particle
+        """
+        width, height = screen.get_size()
+        pixels = np.rint(positions).astype(np.intp)
+        inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < width) \
+            & (pixels[:, 1] >= 0) & (pixels[:, 1] < height)
+        pixels = pixels[inside]
+
+        surface = pygame.surfarray.pixels3d(screen)
+        surface[pixels[:, 0], pixels[:, 1]] = particles.colors[inside]
+        del surface  # unlock the screen
+
+    def draw_heatmap(
+            self,
+            screen: pygame.Surface,
+            box: "_Box",
+            positions: np.ndarray
+    ) -> None:
+        """
+        particle count per cell, binned with numpy and scaled onto the box
+        """
+        cell = self.heatmap_cell
+        nx = max(int(box.size.x) // cell, 1)
+        ny = max(int(box.size.y) // cell, 1)
+
+        cx = ((positions[:, 0] - box.left) // cell).astype(np.intp)
+        cy = ((positions[:, 1] - box.top) // cell).astype(np.intp)
+        np.clip(cx, 0, nx - 1, out=cx)
+        np.clip(cy, 0, ny - 1, out=cy)
+
+        counts = np.bincount(cx * ny + cy, minlength=nx * ny).reshape(nx, ny)
+        density = counts / max(int(counts.max()), 1)
+
+        # fade from the background color to black with rising density
+        background = np.array(self.background, dtype=np.float64)
+        colors = (background * (1 - density[..., None])).astype(np.uint8)
+
+        surface = pygame.surfarray.make_surface(colors)
+        screen.blit(
+            pygame.transform.scale(surface, (nx * cell, ny * cell)),
+            box.pos.xy
+        )
+
+    def _draw_scene(
+            self,
+            screen: pygame.Surface,
+            box: "_Box",
+            particles: "ParticleArrays",
+            positions: np.ndarray | None
+    ) -> None:
+        if positions is None:
+            positions = particles.positions
+
+        match self.mode(particles):
+            case "heatmap":
+                self.draw_heatmap(screen, box, positions)
+
+            case "points":
+                self.draw_points(screen, particles, positions)
+
+            case _:
+                self.draw_particles(screen, particles, positions)
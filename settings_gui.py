@@ -7,10 +7,19 @@ A simple settings panel
 Author:
 Nilusink
 """
+from protocol import Frame, ProtocolError, MAX_DATAGRAM
+from contextlib import suppress
 from threading import Thread
 import customtkinter as ctk
+import itertools
 import socket
-import json
+
+
+# stats updates per second
+STATS_RATE = 2
+
+# milliseconds, has to be below the server's subscription timeout
+SUBSCRIPTION_RENEW = 5000
 
 
 class Window(ctk.CTk):
@@ -18,6 +27,7 @@ class Window(ctk.CTk):
 
     def __init__(self):
         self._box_length = ...
+        self._sequence = itertools.count()
 
         super().__init__()
 
@@ -164,47 +174,50 @@ class Window(ctk.CTk):
 
         self._pressure_label.grid(row=7, column=1)
 
+    def send(self, commands: dict) -> None:
+        """
+        send a batch of commands as one binary frame
+        """
+        self._pg_socket.send(Frame(commands, next(self._sequence)).encode())
+
     def change_speed(self, factor: float) -> None:
-        self._pg_socket.send(json.dumps({"vel": factor}).encode("utf-8"))
+        self.send({"vel": factor})
 
     def change_n_particles(self, number: int) -> None:
-        self._pg_socket.send(json.dumps({"num": number}).encode("utf-8"))
+        self.send({"num": number})
 
     def change_length(self, number: int) -> None:
         if self._box_length is ...:
             return
 
-        self._pg_socket.send(
-            json.dumps({"len": self._box_length + number}).encode("utf-8")
-        )
+        self.send({"len": self._box_length + number})
 
-    def _update_values(self, interval: int) -> None:
+    def _subscribe(self, interval: int) -> None:
         """
-        update velocity and number of particles (recursive)
+        (re-)subscribe to stats pushes, UDP subscriptions time out if they
+        aren't renewed (recursive)
         """
         # only execute if running
         if not self.running:
             return
 
-        # send update request
-        self._pg_socket.send(json.dumps(
-            {"rstats": 1, "rnum": 1}
-        ).encode("utf-8"))
-        self.after(interval, lambda: self._update_values(interval))
+        self.send({"sub": STATS_RATE})
+        self.after(interval, lambda: self._subscribe(interval))
 
     def receive(self) -> None:
         """
-        receive answers from the server
+        receive answers and stats pushes from the server
         """
-        # start updating
-        self.after(500, lambda: self._update_values(500))
+        # show the current values right away, pushes keep them up to date
+        self.send({"rstats": 1, "rnum": 1})
+        self.after(0, lambda: self._subscribe(SUBSCRIPTION_RENEW))
 
         while self.running:
             try:
-                msg = self._pg_socket.recv(1024)
-                data = json.loads(msg.decode('utf-8'))
+                msg = self._pg_socket.recv(MAX_DATAGRAM)
+                data = Frame.decode(msg).commands
 
-            except (TimeoutError, json.JSONDecodeError):
+            except (TimeoutError, ProtocolError):
                 continue
 
             except (ConnectionError, ConnectionResetError):
@@ -212,15 +225,15 @@ class Window(ctk.CTk):
                 return
 
             # parse request
-            for key in data:
+            for key, value in data:
                 match key:
                     case "num":
                         self._n_particles_label.configure(
-                            text=str(data[key])
+                            text=str(value)
                         )
 
                     case "stats":
-                        values = data[key]
+                        values = value
 
                         self._pressure_label.configure(
                             text=str(round(values["p"], 2)) + " P"
@@ -246,6 +259,9 @@ class Window(ctk.CTk):
         close the window
         """
         self.running = False
+        with suppress(OSError):
+            self.send({"sub": 0})
+
         self.destroy()
         exit(0)
 
@@ -0,0 +1,370 @@
+"""
+simulation.py
+16. October 2026
+
+Headless simulation engine (no pygame required)
+
+Author:
+Nilusink
+"""
+from physics_calculations import pressure_from_particles, calculate_temperature
+from commands import CommandQueue
+from instrumentation import Profiler
+from random_streams import RandomStreams
+from spawning import spawn_particles
+from particles import ParticleArrays
+from kernels import make_backend
+from parallel import StripStepper
+from box import _Box
+import typing as tp
+import numpy as np
+import checkpoint
+import argparse
+import math
+import time
+
+
+# velocities are stored in pixels per tick
+TICK_RATE = 60
+
+# the running stats are recomputed this often to get rid of float drift
+STATS_RESYNC_STEPS = 600
+
+
+class Simulation:
+    """
+    owns the particles and the box and advances them step by step
+
+    pygame front-ends only read from the engine, so it can run uncapped on
+    machines without a display
+    """
+    def __init__(
+            self,
+            particles: ParticleArrays | None = None,
+            box: _Box | None = None,
+            world_size: tuple[int, int] | None = (1200, 800),
+            broad_phase: str = "grid",
+            physics_rate: float = TICK_RATE,
+            max_substeps: int = 8,
+            max_frame_steps: int = 10,
+            workers: int = 1,
+            backend: str = "numpy",
+            seed: int | None = None
+    ) -> None:
+        """
+        :param particles: particle store, a new one is created if not given
+        :param box: box, a new one is created if not given
+        :param world_size: set as the box world size (None to skip if
+            the box already has one)
+        :param broad_phase: name of the collision broad phase
+        :param physics_rate: physics steps per simulated second
+        :param max_substeps: upper limit for the adaptive sub-steps
+        :param max_frame_steps: most steps `advance` does per call, time
+            beyond that is dropped instead of slowing down every frame
+        :param workers: processes for moving and colliding, more than one
+            splits the box into strips (see `StripStepper`)
+        :param backend: "numpy" or "numba" (compiled kernels, falls back to
+            numpy if numba isn't installed)
+        :param seed: seed for all random streams, the same seed gives bit
+            identical runs (single process), random if not given
+        """
+        self.box = _Box() if box is None else box
+        if world_size is not None:
+            self.box.world_size = world_size
+
+        if particles is None:
+            particles = ParticleArrays(box=self.box)
+
+        self.particles = particles
+
+        # the engine owns all randomness, the store spawns from its stream
+        self.random = RandomStreams(seed)
+        self.particles.rng = self.random.spawn
+
+        self.backend = make_backend(backend)
+        self.broad_phase = self.backend.broad_phase(broad_phase)
+        self._strips: StripStepper | None = None
+        if workers > 1:
+            self._strips = StripStepper(workers, broad_phase)
+
+        self.physics_rate = physics_rate
+        self.max_substeps = max_substeps
+        self.max_frame_steps = max_frame_steps
+        self.steps = 0
+
+        self._accumulator = 0
+        self._previous_positions = self.particles.positions.copy()
+
+        # every change from outside, applied between two steps, so the
+        # step itself owns the arrays
+        self.commands = CommandQueue()
+
+        # per-phase timers, off until enabled
+        self.profiler = Profiler()
+
+        # called after every step, e.g. to publish stats
+        self.step_hooks: list[tp.Callable[["Simulation"], None]] = []
+        self._stats: dict[str, float] | None = None
+        self._stats_step = -1
+
+    @property
+    def dt(self) -> float:
+        """
+        length of one physics step in ticks
+        """
+        return TICK_RATE / self.physics_rate
+
+    def substeps(self) -> int:
+        """
+        number of sub-steps needed so no particle moves further than the
+        smallest radius during one of them (prevents tunneling)
+        """
+        if len(self.particles) == 0:
+            return 1
+
+        max_distance = float(self.particles.speeds().max()) * self.dt
+        needed = math.ceil(max_distance / float(self.particles.radii.min()))
+
+        return min(max(needed, 1), self.max_substeps)
+
+    def command(self, key: str, value: tp.Any) -> None:
+        """
+        queue `vel` (speed multiplier), `num` (particles to add / remove)
+        or `len` (box length) for the next step boundary (thread safe)
+        """
+        self.commands.put(key, value)
+
+    def schedule(self, command: tp.Callable[[], None]) -> None:
+        """
+        run `command` at the next step boundary (thread safe)
+
+        :raises queue.Full: if too many commands are waiting
+        """
+        self.commands.call(command)
+
+    def apply_pending(self) -> None:
+        """
+        apply everything that was queued since the last step
+        """
+        coalesced, calls = self.commands.drain()
+        for key, value in coalesced.items():
+            match key:
+                case "len":
+                    self.box.set_length(value)
+
+                case "vel":
+                    self.particles.multiply_speeds(value)
+
+                case "num":
+                    self.particles.change_particles(int(value))
+
+        for command in calls:
+            command()
+
+    def step(self, n: int = 1) -> None:
+        """
+        advance the simulation by `n` fixed steps of `dt`
+        """
+        profiler = self.profiler
+        for i in range(n):
+            with profiler.phase("commands"):
+                self.apply_pending()
+
+            # only the state before the last step is needed to interpolate
+            if i == n - 1:
+                self._previous_positions = self.particles.positions.copy()
+
+            substeps = self.substeps()
+            dt = self.dt / substeps
+            for _ in range(substeps):
+                if self._strips is not None:
+                    with profiler.phase("strips"):
+                        profiler.count(
+                            "pairs",
+                            self._strips.substep(self.particles, dt)
+                        )
+
+                    continue
+
+                with profiler.phase("move"):
+                    self.backend.move(self.particles, dt)
+
+                with profiler.phase("broad"):
+                    pairs = self.broad_phase.pairs(self.particles)
+
+                with profiler.phase("collide"):
+                    resolved = self.backend.resolve(self.particles, pairs)
+
+                profiler.count("candidates", len(pairs[0]))
+                profiler.count("pairs", resolved)
+
+            self.steps += 1
+            if self.steps % STATS_RESYNC_STEPS == 0:
+                self.particles.reset_stats()
+
+            with profiler.phase("hooks"):
+                for hook in self.step_hooks:
+                    hook(self)
+
+            profiler.end_step()
+
+    def advance(self, elapsed: float) -> float:
+        """
+        run as many fixed steps as fit into `elapsed` (seconds) plus the
+        time left over from the last call
+
+        :returns: how far the left over time is into the next step (0-1),
+            used to interpolate for rendering
+        """
+        step_time = 1 / self.physics_rate
+        self._accumulator += elapsed
+
+        n = int(self._accumulator / step_time)
+        if n > self.max_frame_steps:
+            # can't keep up, drop the time instead of falling further behind
+            n = self.max_frame_steps
+            self._accumulator = n * step_time
+
+        self.step(n)
+        self._accumulator -= n * step_time
+
+        return self._accumulator / step_time
+
+    def interpolated_positions(self, alpha: float) -> np.ndarray:
+        """
+        particle positions `alpha` of the way from the previous step to the
+        current one
+        """
+        current = self.particles.positions
+        previous = self._previous_positions
+
+        # particles were added or removed since the last step
+        if previous.shape != current.shape:
+            return current
+
+        return previous + (current - previous) * alpha
+
+    def run(self, seconds: float) -> int:
+        """
+        step as fast as possible for `seconds` (wall clock)
+
+        :returns: number of steps done
+        """
+        start_steps = self.steps
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            self.step()
+
+        return self.steps - start_steps
+
+    def save(self, path: str) -> None:
+        """
+        write a checkpoint of the current state
+        """
+        checkpoint.save(path, self.particles, {
+            "steps": self.steps,
+            "random": self.random.state(),
+        })
+
+    def load(self, path: str, mmap: bool = True) -> None:
+        """
+        replace the current state with a checkpoint (see `checkpoint.load`)
+        """
+        _, extra = checkpoint.load(path, self.particles, mmap)
+        self._restore(extra)
+        self._previous_positions = self.particles.positions.copy()
+        self._stats = None
+
+    @classmethod
+    def from_checkpoint(
+            cls,
+            path: str,
+            mmap: bool = True,
+            **kwargs
+    ) -> tp.Self:
+        """
+        new simulation with its own box and species from a checkpoint
+
+        :param kwargs: passed on to the constructor
+        """
+        particles, extra = checkpoint.load(path, mmap=mmap)
+        simulation = cls(particles, particles.box, None, **kwargs)
+        simulation._restore(extra)
+
+        return simulation
+
+    def _restore(self, extra: dict[str, tp.Any]) -> None:
+        """
+        engine state stored next to the particles in a checkpoint
+        """
+        self.steps = extra.get("steps", 0)
+        if "random" in extra:
+            self.random.set_state(extra["random"])
+
+        self.particles.rng = self.random.spawn
+
+    def close(self) -> None:
+        """
+        stop the worker processes (if any)
+        """
+        if self._strips is not None:
+            self._strips.close()
+
+    def stats(self) -> dict[str, float]:
+        """
+        pressure (p), temperature (t) and box length (l)
+
+        computed at most once per step, no matter how many clients ask
+        """
+        if self._stats is not None and self._stats_step == self.steps:
+            return self._stats
+
+        with self.profiler.phase("stats"):
+            volume = self.box.volume
+            pressure = pressure_from_particles(self.particles, volume)
+
+            self._stats = {
+                "p": pressure,
+                "t": calculate_temperature(self.particles, volume, pressure),
+                "l": self.box.size.x,
+            }
+            self._stats_step = self.steps
+
+        return self._stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="run the simulation headless and report its throughput"
+    )
+    parser.add_argument("-n", "--particles", type=int, default=300)
+    parser.add_argument("-s", "--seconds", type=float, default=5)
+    parser.add_argument("-b", "--broad-phase", default="grid")
+    parser.add_argument("-t", "--temperature", type=float, default=10)
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument("--backend", default="numpy")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    simulation = Simulation(
+        broad_phase=args.broad_phase,
+        workers=args.workers,
+        backend=args.backend,
+        seed=args.seed
+    )
+    spawn_particles(simulation.particles, args.particles, args.temperature)
+
+    try:
+        steps = simulation.run(args.seconds)
+
+    finally:
+        simulation.close()
+
+    print(
+        f"{args.particles} particles: {steps} steps in {args.seconds}s "
+        f"({steps / args.seconds:.1f} steps/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+spawning.py
+16. October 2026
+
+Fast, non-overlapping bulk particle spawning
+
+Author:
+Nilusink
+"""
+from physics_calculations import pressure_from_particles, velocity_sigma
+import typing as tp
+import numpy as np
+
+
+if tp.TYPE_CHECKING:
+    from particles import ParticleArrays
+
+
+def _species_mix(
+        particles: "ParticleArrays",
+        count: int,
+        mix: dict[str | int, float] | None,
+        rng: np.random.Generator
+) -> np.ndarray:
+    """
+    draw a species id for every new particle
+
+    :param mix: relative weight per species name or id, all registered
+        species are equally likely if not given
+    """
+    n_species = len(particles.species)
+    if mix is None:
+        return rng.integers(0, n_species, count)
+
+    weights = np.zeros(n_species)
+    for species, weight in mix.items():
+        if isinstance(species, str):
+            species = particles.species.id_of(species)
+
+        weights[species] = weight
+
+    return rng.choice(n_species, count, p=weights / weights.sum())
+
+
+def spawn_particles(
+        particles: "ParticleArrays",
+        count: int,
+        temperature: float,
+        mix: dict[str | int, float] | None = None,
+        rng: np.random.Generator | None = None,
+        recalculate: bool = False
+) -> None:
+    """
+    fill the box with `count` new particles that don't overlap each other
+    or the particles that are already in it
+
+    particles are put on a jittered lattice: the box is split into cells one
+    max diameter wide, every new particle gets a free cell and is moved
+    randomly inside of it, without ever leaving it. velocities are drawn
+    from a Maxwell-Boltzmann distribution at `temperature`
+
+    :param mix: relative weight per species name or id
+    :param rng: random generator, the one of the store if not given
+    :param recalculate: re-solve the box volume for the old pressure
+    :raises ValueError: if there are not enough free cells in the box
+    """
+    if count <= 0:
+        return
+
+    rng = particles.rng if rng is None else rng
+    box = particles.box
+    species = _species_mix(particles, count, mix, rng)
+
+    # lattice inside the walls (particles touching a wall get pushed back)
+    cell = 2 * float(particles.species.radii.max()) + 1
+    left, top = box.left + 1, box.top + 1
+    nx = int((box.right - 1 - left) // cell)
+    ny = int((box.bottom - 1 - top) // cell)
+
+    # cells touched by existing particles are taken
+    free = np.ones((nx, ny), dtype=bool)
+    if len(particles):
+        positions = particles.positions
+        radii = particles.radii[:, None]
+        for corner in (-1, 1):
+            for other in (-1, 1):
+                corners = positions + radii * np.array([corner, other])
+                cx = np.floor((corners[:, 0] - left) / cell).astype(np.intp)
+                cy = np.floor((corners[:, 1] - top) / cell).astype(np.intp)
+                inside = (cx >= 0) & (cx < nx) & (cy >= 0) & (cy < ny)
+                free[cx[inside], cy[inside]] = False
+
+    free_cells = np.flatnonzero(free)
+    if count > len(free_cells):
+        raise ValueError(
+            f"can't fit {count} particles into the box, only "
+            f"{len(free_cells)} free cells"
+        )
+
+    cells = rng.choice(free_cells, count, replace=False)
+    cx, cy = np.divmod(cells, ny)
+
+    # jitter inside the cell, as far as the particle's own radius allows
+    radii = particles.species.radii[species]
+    room = (cell / 2 - radii)[:, None]
+    centers = np.stack((
+        left + (cx + .5) * cell,
+        top + (cy + .5) * cell
+    ), axis=1)
+    positions = centers + rng.uniform(-1, 1, (count, 2)) * room
+
+    # Maxwell-Boltzmann: normal distribution for every velocity component
+    sigma = velocity_sigma(particles.species.masses[species], temperature)
+    velocities = rng.normal(0, 1, (count, 2)) * sigma[:, None]
+
+    bevore_press = pressure_from_particles(particles, box.volume)
+    particles.append_arrays(positions, velocities, species)
+
+    if recalculate and bevore_press:
+        box.recalculate_from_pressure(bevore_press, particles)
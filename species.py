@@ -0,0 +1,113 @@
+"""
+species.py
+16. October 2026
+
+Registry of the gas species in the simulation
+
+Author:
+Nilusink
+"""
+import typing as tp
+import numpy as np
+
+
+class Species:
+    """
+    one type of gas molecule
+    """
+    def __init__(
+            self,
+            name: str,
+            mass: float,
+            radius: float,
+            color: tuple[int, int, int]
+    ) -> None:
+        self.name = name
+        self.mass = mass
+        self.radius = radius
+        self.color = color
+
+    def __repr__(self) -> str:
+        return (
+            f"<Species {self.name}: mass={self.mass}, radius={self.radius}, "
+            f"color={self.color}>"
+        )
+
+
+class SpeciesRegistry:
+    """
+    maps integer species ids to `Species`
+
+    particle stores only keep the id per particle, everything else is
+    looked up here (or in the per-id arrays)
+    """
+    def __init__(self) -> None:
+        self._species: list[Species] = []
+        self._ids: dict[str, int] = {}
+
+    def register(self, species: Species) -> int:
+        """
+        add a new species
+
+        :returns: id of the new species
+        """
+        if species.name in self._ids:
+            raise ValueError(f"species \"{species.name}\" already registered")
+
+        self._ids[species.name] = len(self._species)
+        self._species.append(species)
+
+        return self._ids[species.name]
+
+    def id_of(self, name: str) -> int:
+        return self._ids[name]
+
+    def match(
+            self,
+            mass: float,
+            radius: float,
+            color: tuple[int, int, int]
+    ) -> int:
+        """
+        id of the species with this mass and radius, registers a new one
+        if there is none yet
+        """
+        for i, species in enumerate(self._species):
+            if species.mass == mass and species.radius == radius:
+                return i
+
+        return self.register(Species(
+            f"species {len(self._species)}",
+            mass,
+            radius,
+            color
+        ))
+
+    # per-id arrays
+    @property
+    def masses(self) -> np.ndarray:
+        return np.array([s.mass for s in self._species], dtype=np.float64)
+
+    @property
+    def radii(self) -> np.ndarray:
+        return np.array([s.radius for s in self._species], dtype=np.float64)
+
+    @property
+    def colors(self) -> np.ndarray:
+        return np.array([s.color for s in self._species], dtype=np.uint8)
+
+    # container interface
+    def __getitem__(self, item: int) -> Species:
+        return self._species[item]
+
+    def __len__(self) -> int:
+        return len(self._species)
+
+    def __iter__(self) -> tp.Iterator[Species]:
+        return iter(self._species)
+
+
+# global variables
+SPECIES = SpeciesRegistry()
+SPECIES.register(Species("red", 7*10**(-23), 7, (255, 0, 0)))
+SPECIES.register(Species("blue", 15*10**(-23), 15, (0, 0, 255)))
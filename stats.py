@@ -0,0 +1,115 @@
+"""
+stats.py
+16. October 2026
+
+Running per-species sums for O(1) thermodynamic queries
+
+Author:
+Nilusink
+"""
+import numpy as np
+
+
+class RunningStats:
+    """
+    per-species sums of N, m·v², |v| and m·|v|
+
+    the particle store adds / removes the contribution of every particle
+    whose velocity changes, so queries never have to walk all particles
+    """
+    def __init__(self) -> None:
+        self.count = np.zeros(0, dtype=np.int64)
+        self.mv2 = np.zeros(0, dtype=np.float64)
+        self.speed = np.zeros(0, dtype=np.float64)
+        self.momentum = np.zeros(0, dtype=np.float64)
+
+    def _sums(
+            self,
+            species: np.ndarray,
+            masses: np.ndarray,
+            velocities: np.ndarray
+    ) -> tuple[np.ndarray, ...]:
+        """
+        contribution of the given particles, per species
+        """
+        size = len(self.count)
+        if len(species):
+            size = max(size, int(species.max()) + 1)
+
+        if size > len(self.count):
+            grow = size - len(self.count)
+            self.count = np.concatenate((self.count, np.zeros(grow, np.int64)))
+            self.mv2 = np.concatenate((self.mv2, np.zeros(grow)))
+            self.speed = np.concatenate((self.speed, np.zeros(grow)))
+            self.momentum = np.concatenate((self.momentum, np.zeros(grow)))
+
+        v2 = velocities[:, 0]**2 + velocities[:, 1]**2
+        speeds = np.sqrt(v2)
+
+        return (
+            np.bincount(species, minlength=size),
+            np.bincount(species, masses * v2, minlength=size),
+            np.bincount(species, speeds, minlength=size),
+            np.bincount(species, masses * speeds, minlength=size),
+        )
+
+    def add(
+            self,
+            species: np.ndarray,
+            masses: np.ndarray,
+            velocities: np.ndarray
+    ) -> None:
+        count, mv2, speed, momentum = self._sums(species, masses, velocities)
+        self.count += count
+        self.mv2 += mv2
+        self.speed += speed
+        self.momentum += momentum
+
+    def remove(
+            self,
+            species: np.ndarray,
+            masses: np.ndarray,
+            velocities: np.ndarray
+    ) -> None:
+        count, mv2, speed, momentum = self._sums(species, masses, velocities)
+        self.count -= count
+        self.mv2 -= mv2
+        self.speed -= speed
+        self.momentum -= momentum
+
+    def scale(self, mult: float) -> None:
+        """
+        every velocity has been multiplied by `mult`
+        """
+        self.mv2 *= mult**2
+        self.speed *= abs(mult)
+        self.momentum *= abs(mult)
+
+    def reset(
+            self,
+            species: np.ndarray,
+            masses: np.ndarray,
+            velocities: np.ndarray
+    ) -> None:
+        """
+        recompute everything from scratch (removes accumulated float drift)
+        """
+        self.__init__()
+        self.add(species, masses, velocities)
+
+    # totals over all species
+    @property
+    def n(self) -> int:
+        return int(self.count.sum())
+
+    @property
+    def mv2_total(self) -> float:
+        return float(self.mv2.sum())
+
+    @property
+    def speed_total(self) -> float:
+        return float(self.speed.sum())
+
+    @property
+    def momentum_total(self) -> float:
+        return float(self.momentum.sum())
@@ -12,6 +12,14 @@ import math as m
 
 
 class Vec2[T: (int, float)]:
+    """
+    2D vector with cartesian and polar access
+
+    only the representation that was written last is kept up to date, the
+    other one is computed when it is read for the first time
+    """
+    __slots__ = ("__x", "__y", "__angle", "__length", "__stale")
+
     x: T
     y: T
     angle: T
@@ -23,40 +31,61 @@ class Vec2[T: (int, float)]:
         self.__angle: T = 0
         self.__length: T = 0
 
+        # which representation is out of date: cartesian (c), polar (p)
+        self.__stale: tp.Literal["c", "p"] | None = None
+
     # variable getters / setters
     @property
     def x(self) -> T:
+        if self.__stale == "c":
+            self.__to_cartesian()
+
         return self.__x
 
     @x.setter
     def x(self, value: T):
+        if self.__stale == "c":
+            self.__to_cartesian()
+
         self.__x = value
-        self.__update("c")
+        self.__stale = "p"
 
     @property
     def y(self) -> T:
+        if self.__stale == "c":
+            self.__to_cartesian()
+
         return self.__y
 
     @y.setter
     def y(self, value: T):
+        if self.__stale == "c":
+            self.__to_cartesian()
+
         self.__y = value
-        self.__update("c")
+        self.__stale = "p"
 
     @property
     def xy(self) -> tuple[T, T]:
+        if self.__stale == "c":
+            self.__to_cartesian()
+
         return self.__x, self.__y
 
     @xy.setter
     def xy(self, xy: tuple[T, T]):
         self.__x = xy[0]
         self.__y = xy[1]
-        self.__update("c")
+        self.__stale = "p"
 
     @property
     def angle(self) -> float:
         """
         value in radian
         """
+        if self.__stale == "p":
+            self.__to_polar()
+
         return self.__angle
 
     @angle.setter
@@ -64,29 +93,39 @@ class Vec2[T: (int, float)]:
         """
         value in radian
         """
-        value = self.normalize_angle(value)
+        if self.__stale == "p":
+            self.__to_polar()
 
-        self.__angle = value
-        self.__update("p")
+        self.__angle = self.normalize_angle(value)
+        self.__stale = "c"
 
     @property
     def length(self) -> float:
+        if self.__stale == "p":
+            self.__to_polar()
+
         return self.__length
 
     @length.setter
     def length(self, value: float):
+        if self.__stale == "p":
+            self.__to_polar()
+
         self.__length = value
-        self.__update("p")
+        self.__stale = "c"
 
     @property
     def polar(self) -> tuple[float, float]:
+        if self.__stale == "p":
+            self.__to_polar()
+
         return self.__angle, self.__length
 
     @polar.setter
     def polar(self, polar: tuple[float, float]):
         self.__angle = polar[0]
         self.__length = polar[1]
-        self.__update("p")
+        self.__stale = "c"
 
     # interaction
     def split_vector(self, direction: tp.Self) -> tuple[tp.Self, tp.Self]:
@@ -158,24 +197,60 @@ class Vec2[T: (int, float)]:
     def __truediv__(self, other: tp.Self):
         return Vec2.from_cartesian(x=self.x / other, y=self.y / other)
 
+    # in-place maths (no new vector)
+    def __iadd__(self, other: tp.Self | T) -> tp.Self:
+        if issubclass(type(other), Vec2):
+            other_x, other_y = other.xy
+
+        else:
+            other_x = other_y = other
+
+        x, y = self.xy
+        self.xy = x + other_x, y + other_y
+        return self
+
+    def __isub__(self, other: tp.Self | T) -> tp.Self:
+        if issubclass(type(other), Vec2):
+            other_x, other_y = other.xy
+
+        else:
+            other_x = other_y = other
+
+        x, y = self.xy
+        self.xy = x - other_x, y - other_y
+        return self
+
+    def __imul__(self, other: tp.Self | float) -> tp.Self:
+        if issubclass(type(other), Vec2):
+            angle, length = self.polar
+            self.polar = angle + other.angle, length * other.length
+            return self
+
+        x, y = self.xy
+        self.xy = x * other, y * other
+        return self
+
+    def __itruediv__(self, other: float) -> tp.Self:
+        x, y = self.xy
+        self.xy = x / other, y / other
+        return self
+
     # internal functions
-    def __update(
-            self,
-            calc_from: tp.Literal["p", "polar", "c", "cartesian"]
-    ) -> None:
+    def __to_cartesian(self) -> None:
         """
-        :param calc_from: polar (p) | cartesian (c)
+        recalculate x and y from angle and length
         """
-        if calc_from in ("p", "polar"):
-            self.__x = m.cos(self.angle) * self.length
-            self.__y = m.sin(self.angle) * self.length
+        self.__x = m.cos(self.__angle) * self.__length
+        self.__y = m.sin(self.__angle) * self.__length
+        self.__stale = None
 
-        elif calc_from in ("c", "cartesian"):
-            self.__length = m.sqrt(self.x**2 + self.y**2)
-            self.__angle = m.atan2(self.y, self.x)
-
-        else:
-            raise ValueError("Invalid value for \"calc_from\"")
+    def __to_polar(self) -> None:
+        """
+        recalculate angle and length from x and y
+        """
+        self.__length = m.sqrt(self.__x**2 + self.__y**2)
+        self.__angle = m.atan2(self.__y, self.__x)
+        self.__stale = None
 
     def __abs__(self) -> float:
         return m.sqrt(self.x**2 + self.y**2)